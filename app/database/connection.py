@@ -1,27 +1,116 @@
 import os
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.database.models import Base
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+"""
+DATABASE_URL
+- 동기 URL(sqlite:///...)과 비동기 URL(sqlite+aiosqlite:///..., postgresql+asyncpg://...) 모두 허용
+- API 요청은 비동기 엔진(AsyncSession), 백그라운드 스레드와 스크립트는 동기 엔진(SessionLocal) 사용
+- SQLite / PostgreSQL만 지원 (crud의 ON CONFLICT upsert와 정화 시간 계산이 두 dialect 기준)
+"""
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app/database/sql_app.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+SYNC_DRIVERS = {"sqlite": "pysqlite", "postgresql": "psycopg2"}
+
+def with_driver(url: str, drivers) -> str:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in drivers:
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=f"{backend}+{drivers[backend]}").render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = with_driver(DATABASE_URL, ASYNC_DRIVERS)
+SYNC_DATABASE_URL = with_driver(DATABASE_URL, SYNC_DRIVERS)
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+def engine_options():
+    """
+    SQLite 메모리 DB는 연결마다 별도 DB가 되므로 기본 풀을 사용하고, 그 외에는 풀 크기를 지정
+    """
+    if IS_SQLITE and make_url(DATABASE_URL).database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": not IS_SQLITE
+    }
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    - WAL : 쓰기 중에도 읽기 가능
+    - synchronous=NORMAL : WAL에서 커밋마다 fsync 하지 않음
+    - mmap_size : 읽기를 메모리 맵으로 처리
+    - busy_timeout : 잠금 대기 시 바로 실패하지 않고 대기
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
 
 engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    SYNC_DATABASE_URL,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **engine_options()
+)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000} if IS_SQLITE else {},
+    **engine_options()
 )
 
+if IS_SQLITE:
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
 SessionLocal = sessionmaker(
-    autocommit=False, 
-    autoflush=False, 
+    autocommit=False,
+    autoflush=False,
     bind=engine
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+"""
+create_all은 기존 테이블에 컬럼을 추가하지 않으므로, 나중에 추가된 컬럼은 init_db에서 ALTER TABLE로 추가
+- (table, column, DDL)
+"""
+ADDED_COLUMNS = [
+    ("device", "report_version", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+def add_missing_columns():
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table, column, ddl in ADDED_COLUMNS:
+            if column not in {existing["name"] for existing in inspector.get_columns(table)}:
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                logger.info("Added column %s.%s", table, column)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
     logger.info("Database tables created and initialized.")
 
 def get_db():
@@ -29,4 +118,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_engines():
+    await async_engine.dispose()
+    engine.dispose()
\ No newline at end of file
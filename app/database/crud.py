@@ -1,103 +1,392 @@
 import json
+import uuid
 import logging
-from sqlalchemy.orm import Session
-from app.database.models import Device, HourlyData, DailyData, Recommendation
+from datetime import date as date_type, datetime, timezone, timedelta
+from sqlalchemy import select, update, func, cast, Integer
+from sqlalchemy.orm import Session, joinedload
+from app.services.metrics import db_timed
+from app.database.models import (
+    Device, HourlyData, DailyData, DailyAggregate, Recommendation, InsightCache, SensorReading, CleanSession,
+    RecommendationJob
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def create_device(db: Session, device_id: int):
-    logger.info("Creating device with device_id: %s", device_id)
-    device = db.query(Device).filter(Device.device_id == device_id).first()
-    if device:
-        logger.info("Device %s already exists", device_id)
-        return device
-    
-    try:
-        device = Device(device_id=device_id)
-        hourly = HourlyData(device_id=device_id, timestamp=None, period=None, pm_current=None)
-        daily = DailyData(device_id=device_id)
-        reco = Recommendation(device_id=device_id)
-
-        db.add_all([device, hourly, daily, reco])
-        db.commit()
-        logger.info("Device %s and related records created", device_id)
-    except Exception as e:
-        db.rollback()
-        logger.error("Error creating device %s: %s", device_id, str(e))
-        raise e
+def get_insert(db: Session):
+    """
+    ON CONFLICT를 지원하는 dialect별 insert
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
 
-    return device
+@db_timed
+def create_device(db: Session, device_id: int):
+    """
+    INSERT ... ON CONFLICT DO NOTHING으로 생성하므로 같은 기기의 첫 요청이 동시에 와도 충돌하지 않음
+    """
+    create_devices(db, [device_id])
+    return get_device(db, device_id)
 
+@db_timed
 def get_device(db: Session, device_id: int):
     logger.info("Fetching device data for device_id: %s", device_id)
     return db.query(Device).filter(Device.device_id == device_id).first()
 
+@db_timed
+def get_device_report(db: Session, device_id: int):
+    """
+    기기와 hourly_data / daily_data / recommendation을 한 번의 JOIN 쿼리로 조회
+    """
+    logger.info("Fetching device report for device_id: %s", device_id)
+    return db.query(Device).options(
+        joinedload(Device.hourly_data),
+        joinedload(Device.daily_data),
+        joinedload(Device.recommendation)
+    ).filter(Device.device_id == device_id).first()
+
+@db_timed
+def get_report_version(db: Session, device_id: int):
+    """
+    기기가 없으면 None
+    """
+    return db.execute(select(Device.report_version).where(Device.device_id == device_id)).scalar_one_or_none()
+
+@db_timed
+def bump_report_versions(db: Session, device_ids):
+    """
+    리포트에 포함되는 데이터가 바뀐 기기의 report_version 증가 (커밋은 호출 측 트랜잭션에서)
+    """
+    db.execute(
+        update(Device)
+        .where(Device.device_id.in_(list(device_ids)))
+        .values(report_version=Device.report_version + 1)
+    )
+
+@db_timed
 def get_hourly_data(db: Session, device_id: int):
     logger.info("Fetching hourly data for device_id: %s", device_id)
     return db.query(HourlyData).filter(HourlyData.device_id == device_id).first()
 
+@db_timed
 def get_daily_data(db: Session, device_id: int):
     logger.info("Fetching daily data for device_id: %s", device_id)
     return db.query(DailyData).filter(DailyData.device_id == device_id).first()
 
+@db_timed
 def get_recommendation(db: Session, device_id: int):
     logger.info("Fetching recommendation for device_id: %s", device_id)
     return db.query(Recommendation).filter(Recommendation.device_id == device_id).first()
 
+@db_timed
 def update_hourly_data(db: Session, device_id: int, timestamp, pm_current: float, period=None):
     logger.info("Updating hourly data for device_id: %s", device_id)
-    hourly = db.query(HourlyData).filter(HourlyData.device_id == device_id).first()
-    if not hourly:
-        logger.info("Hourly data for device_id %s not found", device_id)
-        return None
-    
+    upsert_hourly_data(db, [{"device_id": device_id, "timestamp": timestamp, "pm_current": pm_current, "period": period}])
+
+@db_timed
+def update_daily_data(db: Session, device_id: int, average_pm, average_clean_time, average_clean_amount):
+    logger.info("Updating daily data for device_id: %s", device_id)
+    upsert_daily_data(db, [{
+        "device_id": device_id,
+        "average_pm": average_pm,
+        "average_clean_time": average_clean_time,
+        "average_clean_amount": average_clean_amount
+    }])
+
+@db_timed
+def create_devices(db: Session, device_ids, commit: bool = True):
+    """
+    여러 기기와 관련 레코드를 한 번에 생성 (이미 있는 기기는 무시)
+    """
+    device_ids = list(dict.fromkeys(device_ids))
+    logger.info("Creating %s device(s)", len(device_ids))
+    if not device_ids:
+        return
+
+    insert = get_insert(db)
     try:
-        hourly.timestamp = timestamp
-        hourly.pm_current = pm_current
+        for model in (Device, HourlyData, DailyData, Recommendation):
+            db.execute(
+                insert(model).values([{"device_id": device_id} for device_id in device_ids])
+                .on_conflict_do_nothing(index_elements=["device_id"])
+            )
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error creating devices: %s", str(e))
+        raise e
 
-        if period is not None:
-            hourly.period = period
+@db_timed
+def upsert_hourly_data(db: Session, rows, commit: bool = True):
+    """
+    rows : [{"device_id", "timestamp", "pm_current", "period"}, ...]
+    - period가 None이면 기존 값 유지
+    """
+    logger.info("Upserting hourly data for %s device(s)", len(rows))
+    if not rows:
+        return
 
-        db.commit()
-        logger.info("Hourly data for device_id %s updated", device_id)
+    insert = get_insert(db)
+    try:
+        stmt = insert(HourlyData).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["device_id"],
+            set_={
+                "timestamp": stmt.excluded.timestamp,
+                "pm_current": stmt.excluded.pm_current,
+                "period": func.coalesce(stmt.excluded.period, HourlyData.period)
+            }
+        )
+        db.execute(stmt)
+        bump_report_versions(db, {row["device_id"] for row in rows})
+        if commit:
+            db.commit()
     except Exception as e:
         db.rollback()
-        logger.error("Error updating hourly data for device_id %s: %s", device_id, str(e))
+        logger.error("Error upserting hourly data: %s", str(e))
         raise e
-    
-    return hourly
 
-def update_daily_data(db: Session, device_id: int, average_pm, average_clean_time, average_clean_amount):
-    logger.info("Updating daily data for device_id: %s", device_id)
-    daily = db.query(DailyData).filter(DailyData.device_id == device_id).first()
-    if not daily:
-        logger.info("Daily data for device_id %s not found", device_id)
-        return None
+@db_timed
+def upsert_daily_data(db: Session, rows, commit: bool = True):
+    """
+    rows : [{"device_id", "average_pm", "average_clean_time", "average_clean_amount"}, ...] (배열은 JSON 문자열로 저장)
+    """
+    logger.info("Upserting daily data for %s device(s)", len(rows))
+    if not rows:
+        return
 
+    insert = get_insert(db)
     try:
-        daily.average_pm = json.dumps(average_pm)
-        daily.average_clean_time = json.dumps(average_clean_time)
-        daily.average_clean_amount = json.dumps(average_clean_amount)
+        stmt = insert(DailyData).values([
+            {
+                "device_id": row["device_id"],
+                "average_pm": json.dumps(row["average_pm"]),
+                "average_clean_time": json.dumps(row["average_clean_time"]),
+                "average_clean_amount": json.dumps(row["average_clean_amount"])
+            }
+            for row in rows
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["device_id"],
+            set_={
+                "average_pm": stmt.excluded.average_pm,
+                "average_clean_time": stmt.excluded.average_clean_time,
+                "average_clean_amount": stmt.excluded.average_clean_amount
+            }
+        )
+        db.execute(stmt)
+        bump_report_versions(db, {row["device_id"] for row in rows})
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error upserting daily data: %s", str(e))
+        raise e
 
-        db.commit()
-        logger.info("Daily data for device_id %s updated", device_id)
+@db_timed
+def bulk_insert_sensor_readings(db: Session, readings, commit: bool = True):
+    """
+    readings : [{"device_id", "recorded_at", "pm", "temperature", "humidity", "location"}, ...]
+    """
+    logger.info("Inserting %s sensor reading(s)", len(readings))
+    if not readings:
+        return 0
+
+    insert = get_insert(db)
+    try:
+        stmt = insert(SensorReading).on_conflict_do_nothing(index_elements=["device_id", "recorded_at"])
+        inserted = db.connection().execute(stmt, readings).rowcount
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error inserting sensor readings: %s", str(e))
+        raise e
+
+    return inserted
+
+@db_timed
+def bulk_insert_clean_sessions(db: Session, sessions, commit: bool = True):
+    """
+    sessions : [{"device_id", "started_at", "finished_at", "dust_level_before", "dust_level_after", "created_at"}, ...]
+    """
+    logger.info("Inserting %s clean session(s)", len(sessions))
+    if not sessions:
+        return 0
+
+    insert = get_insert(db)
+    try:
+        stmt = insert(CleanSession).on_conflict_do_nothing(index_elements=["device_id", "started_at"])
+        inserted = db.connection().execute(stmt, sessions).rowcount
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error inserting clean sessions: %s", str(e))
+        raise e
+
+    return inserted
+
+def duration_hours(db: Session, started_at, finished_at):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", finished_at - started_at) / 3600.0
+    return (cast(func.strftime("%s", finished_at), Integer) - cast(func.strftime("%s", started_at), Integer)) / 3600.0
+
+def as_date(value):
+    return date_type.fromisoformat(value) if isinstance(value, str) else value
+
+def as_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+@db_timed
+def refresh_daily_aggregates(db: Session, dates_by_device, commit: bool = True):
+    """
+    원본 테이블을 (기기, 날짜)별로 GROUP BY 하여 daily_aggregate의 해당 날짜를 다시 계산
+    - dates_by_device : {device_id: {date, ...}}
+    - 누적이 아닌 재계산이므로 같은 데이터를 다시 보내도 결과가 같음
+    """
+    dates_by_device = {device_id: dates for device_id, dates in dates_by_device.items() if dates}
+    if not dates_by_device:
+        return
+
+    logger.info("Refreshing daily aggregates for %s device(s)", len(dates_by_device))
+    device_ids = list(dates_by_device)
+    all_dates = set().union(*dates_by_device.values())
+    start = datetime.combine(min(all_dates), datetime.min.time())
+    end = datetime.combine(max(all_dates) + timedelta(days=1), datetime.min.time())
+
+    sensor_day = func.date(SensorReading.recorded_at)
+    sensor_rows = db.execute(
+        select(SensorReading.device_id, sensor_day, func.sum(SensorReading.pm), func.count(SensorReading.pm))
+        .where(SensorReading.device_id.in_(device_ids), SensorReading.recorded_at >= start, SensorReading.recorded_at < end)
+        .group_by(SensorReading.device_id, sensor_day)
+    ).all()
+
+    clean_day = func.date(CleanSession.started_at)
+    clean_rows = db.execute(
+        select(
+            CleanSession.device_id,
+            clean_day,
+            func.sum(duration_hours(db, CleanSession.started_at, CleanSession.finished_at)),
+            func.sum(CleanSession.dust_level_before - CleanSession.dust_level_after),
+            func.count(),
+            func.min(CleanSession.created_at)
+        )
+        .where(CleanSession.device_id.in_(device_ids), CleanSession.started_at >= start, CleanSession.started_at < end)
+        .group_by(CleanSession.device_id, clean_day)
+    ).all()
+
+    aggregates = {
+        (device_id, date): {
+            "device_id": device_id, "date": date,
+            "pm_sum": 0.0, "pm_count": 0, "clean_time": 0.0, "clean_amount": 0.0, "clean_count": 0, "earliest_created_at": None
+        }
+        for device_id, dates in dates_by_device.items()
+        for date in dates
+    }
+    for device_id, day, pm_sum, pm_count in sensor_rows:
+        aggregate = aggregates.get((device_id, as_date(day)))
+        if aggregate:
+            aggregate.update(pm_sum=pm_sum or 0.0, pm_count=pm_count)
+    for device_id, day, clean_time, clean_amount, clean_count, earliest_created_at in clean_rows:
+        aggregate = aggregates.get((device_id, as_date(day)))
+        if aggregate:
+            aggregate.update(
+                clean_time=clean_time or 0.0, clean_amount=clean_amount or 0.0,
+                clean_count=clean_count, earliest_created_at=as_datetime(earliest_created_at)
+            )
+
+    insert = get_insert(db)
+    try:
+        stmt = insert(DailyAggregate).values(list(aggregates.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["device_id", "date"],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("pm_sum", "pm_count", "clean_time", "clean_amount", "clean_count", "earliest_created_at")
+            }
+        )
+        db.execute(stmt)
+        if commit:
+            db.commit()
     except Exception as e:
         db.rollback()
-        logger.error("Error updating daily data for device_id %s: %s", device_id, str(e))
+        logger.error("Error refreshing daily aggregates: %s", str(e))
         raise e
 
-    return daily
+@db_timed
+def get_latest_reading_times(db: Session, device_ids):
+    """
+    기기별로 저장된 SensorArchive의 마지막 기록 시각 : {device_id: recorded_at}
+    """
+    rows = db.execute(
+        select(SensorReading.device_id, func.max(SensorReading.recorded_at))
+        .where(SensorReading.device_id.in_(list(device_ids)))
+        .group_by(SensorReading.device_id)
+    ).all()
+    return {device_id: as_datetime(latest) for device_id, latest in rows if latest}
+
+@db_timed
+def get_ingested_keys(db: Session, device_ids, since):
+    """
+    since 이후에 저장된 SensorArchive / CleanLog 행의 기본키
+    - 반환 : ({(device_id, recorded_at), ...}, {(device_id, started_at), ...})
+    """
+    device_ids = list(device_ids)
+    sensor_rows = db.execute(
+        select(SensorReading.device_id, SensorReading.recorded_at)
+        .where(SensorReading.device_id.in_(device_ids), SensorReading.recorded_at >= since)
+    ).all()
+    clean_rows = db.execute(
+        select(CleanSession.device_id, CleanSession.started_at)
+        .where(CleanSession.device_id.in_(device_ids), CleanSession.started_at >= since)
+    ).all()
+    return (
+        {(device_id, as_datetime(recorded_at)) for device_id, recorded_at in sensor_rows},
+        {(device_id, as_datetime(started_at)) for device_id, started_at in clean_rows}
+    )
+
+@db_timed
+def get_daily_aggregates(db: Session, device_ids):
+    logger.info("Fetching daily aggregates for %s device(s)", len(device_ids))
+    return db.query(DailyAggregate).filter(
+        DailyAggregate.device_id.in_(list(device_ids))
+    ).order_by(DailyAggregate.device_id, DailyAggregate.date).all()
+
+@db_timed
+def delete_daily_aggregates_before(db: Session, device_id: int, date, commit: bool = True):
+    logger.info("Deleting daily aggregates before %s for device_id: %s", date, device_id)
+    try:
+        db.query(DailyAggregate).filter(
+            DailyAggregate.device_id == device_id,
+            DailyAggregate.date < date
+        ).delete(synchronize_session=False)
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error deleting daily aggregates for device_id %s: %s", device_id, str(e))
+        raise e
 
+@db_timed
 def update_recommendation(db: Session, device_id: int, recommendations):
+    """
+    조회 없이 INSERT ... ON CONFLICT DO UPDATE 한 번으로 저장
+    """
     logger.info("Updating recommendation for device_id: %s", device_id)
-    reco = db.query(Recommendation).filter(Recommendation.device_id == device_id).first()
-    if not reco:
-        logger.info("Recommendation for device_id %s not found", device_id)
-        return None
-
+    insert = get_insert(db)
     try:
-        reco.recommendations = json.dumps(recommendations)
+        stmt = insert(Recommendation).values(device_id=device_id, recommendations=json.dumps(recommendations))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["device_id"],
+            set_={"recommendations": stmt.excluded.recommendations}
+        )
+        db.execute(stmt)
+        bump_report_versions(db, [device_id])
         db.commit()
         logger.info("Recommendation for device_id %s updated", device_id)
     except Exception as e:
@@ -105,4 +394,163 @@ def update_recommendation(db: Session, device_id: int, recommendations):
         logger.error("Error updating recommendation for device_id %s: %s", device_id, str(e))
         raise e
 
-    return reco
+    return recommendations
+
+@db_timed
+def get_insight_cache(db: Session, model_version: str, case: str, insight_number: int, input_string: str):
+    return db.get(InsightCache, (model_version, case, insight_number, input_string))
+
+@db_timed
+def save_insight_cache(db: Session, model_version: str, case: str, insight_number: int, input_string: str, result: str):
+    try:
+        cached = InsightCache(
+            model_version=model_version,
+            case=case,
+            insight_number=insight_number,
+            input_string=input_string,
+            result=result,
+            created_at=datetime.now(timezone.utc)
+        )
+        db.merge(cached)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error saving insight cache for %s/%s: %s", case, insight_number, str(e))
+        raise e
+
+    return cached
+
+@db_timed
+def count_queued_recommendation_jobs(db: Session):
+    return db.query(func.count(RecommendationJob.job_id)).filter(RecommendationJob.status == "queued").scalar()
+
+@db_timed
+def enqueue_recommendation_jobs(db: Session, device_ids, max_depth: int, reserved: int = 0, commit: bool = True):
+    """
+    기기별 추천 생성 작업 등록 (device_ids 순서대로 작업 목록 반환)
+    - 같은 기기의 queued 작업이 있으면(다른 워커 프로세스가 등록한 작업 포함) 새로 만들지 않고 coalesced만 증가
+    - 새 작업은 queued 작업 + reserved(대기 중인 스트림)가 max_depth에 닿을 때까지만 device_ids 순서대로 등록하고,
+      자리가 없어 등록하지 못한 기기의 항목은 None
+    """
+    unique_ids = list(dict.fromkeys(device_ids))
+    try:
+        jobs = {
+            job.device_id: job for job in db.query(RecommendationJob).filter(
+                RecommendationJob.device_id.in_(unique_ids),
+                RecommendationJob.status == "queued"
+            )
+        }
+        new_ids = [device_id for device_id in unique_ids if device_id not in jobs]
+
+        for device_id, job in list(jobs.items()):
+            merged = db.execute(
+                update(RecommendationJob)
+                .where(RecommendationJob.job_id == job.job_id, RecommendationJob.status == "queued")
+                .values(coalesced=RecommendationJob.coalesced + 1)
+            ).rowcount
+            if merged:
+                logger.info("Coalesced recommendation request for device_id %s into job %s", device_id, job.job_id)
+            else:
+                del jobs[device_id]
+                new_ids.append(device_id)
+
+        free = max(0, max_depth - count_queued_recommendation_jobs(db) - reserved) if new_ids else 0
+        if len(new_ids) > free:
+            logger.warning("Recommendation queue is full; rejected %s of %s new job(s)", len(new_ids) - free, len(new_ids))
+        created_at = datetime.now(timezone.utc)
+        for device_id in new_ids[:free]:
+            jobs[device_id] = RecommendationJob(
+                job_id=uuid.uuid4().hex, device_id=device_id, status="queued", coalesced=0, created_at=created_at
+            )
+            db.add(jobs[device_id])
+            logger.info("Queued recommendation job %s for device_id %s", jobs[device_id].job_id, device_id)
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error queueing recommendation jobs: %s", str(e))
+        raise e
+
+    return [jobs.get(device_id) for device_id in device_ids]
+
+@db_timed
+def claim_recommendation_job(db: Session):
+    """
+    가장 오래된 queued 작업을 running으로 바꾸고 반환 (없으면 None)
+    - 다른 워커가 먼저 가져간 작업은 조건부 UPDATE가 0행이 되므로 다음 작업 시도
+    """
+    try:
+        candidates = db.scalars(
+            select(RecommendationJob.job_id)
+            .where(RecommendationJob.status == "queued")
+            .order_by(RecommendationJob.created_at)
+            .limit(10)
+        ).all()
+        for job_id in candidates:
+            claimed = db.execute(
+                update(RecommendationJob)
+                .where(RecommendationJob.job_id == job_id, RecommendationJob.status == "queued")
+                .values(status="running", started_at=datetime.now(timezone.utc))
+            ).rowcount
+            if claimed:
+                db.commit()
+                return db.get(RecommendationJob, job_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error claiming recommendation job: %s", str(e))
+        raise e
+
+    return None
+
+@db_timed
+def finish_recommendation_job(db: Session, job_id: str, status: str, error: str = None, commit: bool = True):
+    try:
+        db.execute(
+            update(RecommendationJob)
+            .where(RecommendationJob.job_id == job_id)
+            .values(status=status, error=error, finished_at=datetime.now(timezone.utc))
+        )
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error finishing recommendation job %s: %s", job_id, str(e))
+        raise e
+
+@db_timed
+def delete_finished_recommendation_jobs(db: Session, keep: int, commit: bool = True):
+    """
+    완료 / 실패한 작업은 최근 keep개만 유지
+    """
+    finished = RecommendationJob.status.in_(("done", "failed"))
+    try:
+        cutoff = db.scalars(
+            select(RecommendationJob.created_at)
+            .where(finished)
+            .order_by(RecommendationJob.created_at.desc())
+            .offset(keep)
+            .limit(1)
+        ).first()
+        if cutoff is not None:
+            db.query(RecommendationJob).filter(
+                finished,
+                RecommendationJob.created_at <= cutoff
+            ).delete(synchronize_session=False)
+        if commit:
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error deleting finished recommendation jobs: %s", str(e))
+        raise e
+
+@db_timed
+def get_recommendation_job(db: Session, job_id: str):
+    return db.get(RecommendationJob, job_id)
+
+@db_timed
+def has_queued_recommendation_job(db: Session, device_id: int):
+    return db.query(RecommendationJob.job_id).filter(
+        RecommendationJob.device_id == device_id,
+        RecommendationJob.status == "queued"
+    ).first() is not None
\ No newline at end of file
@@ -1,13 +1,17 @@
 import json
-from sqlalchemy import Column, BigInteger, Float, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, BigInteger, Integer, Float, String, Date, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
 class Device(Base):
+    """
+    - report_version : hourly_data / daily_data / recommendation이 바뀔 때마다 1씩 증가 (주간 리포트 응답 캐시와 ETag에 사용)
+    """
     __tablename__ = 'device'
     device_id = Column(BigInteger, primary_key=True)
+    report_version = Column(Integer, nullable=False, default=0, server_default="0")
     hourly_data = relationship("HourlyData", back_populates="device", uselist=False)
     daily_data = relationship("DailyData", back_populates="device", uselist=False)
     recommendation = relationship("Recommendation", back_populates="device", uselist=False)
@@ -38,13 +42,117 @@ class DailyData(Base):
     average_clean_amount = Column(Text, nullable=False, default=lambda: json.dumps([[0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0]]))
     device = relationship("Device", back_populates="daily_data")
 
+class SensorReading(Base):
+    """
+    SensorArchive 원본 데이터
+    - (device_id, recorded_at) 복합 기본키 : 같은 측정값을 다시 보내도 한 번만 저장
+    """
+    __tablename__ = 'sensor_reading'
+    device_id = Column(BigInteger, ForeignKey("device.device_id"), primary_key=True, nullable=False)
+    recorded_at = Column(DateTime, primary_key=True, nullable=False)
+    pm = Column(Float, nullable=True)
+    temperature = Column(Float, nullable=True)
+    humidity = Column(Float, nullable=True)
+    location = Column(String, nullable=True)
+
+class CleanSession(Base):
+    """
+    CleanLog 원본 데이터
+    - (device_id, started_at) 복합 기본키 : 같은 정화 기록을 다시 보내도 한 번만 저장
+    """
+    __tablename__ = 'clean_session'
+    device_id = Column(BigInteger, ForeignKey("device.device_id"), primary_key=True, nullable=False)
+    started_at = Column(DateTime, primary_key=True, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    dust_level_before = Column(Float, nullable=False)
+    dust_level_after = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    __table_args__ = (
+        Index("ix_clean_session_device_created_at", "device_id", "created_at"),
+    )
+
+class DailyAggregate(Base):
+    """
+    기기별 일별 집계
+    - sensor_reading / clean_session 원본을 SQL GROUP BY로 날짜별 합계와 개수로 집계하여 저장
+    - 최근 14일만 유지하고, averagePm / averageCleanTime / averageCleanAmount는 이 집계로부터 계산
+    """
+    __tablename__ = 'daily_aggregate'
+    device_id = Column(BigInteger, ForeignKey("device.device_id"), primary_key=True, nullable=False)
+    date = Column(Date, primary_key=True, nullable=False)
+    pm_sum = Column(Float, nullable=False, default=0.0)
+    pm_count = Column(Integer, nullable=False, default=0)
+    clean_time = Column(Float, nullable=False, default=0.0)
+    clean_amount = Column(Float, nullable=False, default=0.0)
+    clean_count = Column(Integer, nullable=False, default=0)
+    earliest_created_at = Column(DateTime, nullable=True)
+
 class Recommendation(Base):
     """
     매시간마다 업데이트 되는 데이터
     - sLLM 모델 추론 후 생성되는 recommendations
     - 배열 형태의 데이터를 JSON 문자열로 저장
+    - 각 항목은 {"recommendation", "case", "input"} 형태로, 입력이 바뀐 인사이트만 다시 생성하는 데 사용
+      (이전 형식인 문자열 항목도 허용)
     """
     __tablename__ = 'recommendation'
     device_id = Column(BigInteger, ForeignKey("device.device_id"), primary_key=True, nullable=False)
     recommendations = Column(Text, nullable=False, default=lambda: json.dumps(["아직 데이터가 충분하지 않습니다..."] * 4))
-    device = relationship("Device", back_populates="recommendation")
\ No newline at end of file
+    device = relationship("Device", back_populates="recommendation")
+
+    def get_entries(self):
+        entries = json.loads(self.recommendations) if self.recommendations else []
+        return [
+            entry if isinstance(entry, dict) else {"recommendation": entry, "case": None, "input": None}
+            for entry in entries
+        ]
+
+    def get_texts(self):
+        return [entry["recommendation"] for entry in self.get_entries()]
+
+class InsightCache(Base):
+    """
+    sLLM 추론 결과 캐시
+    - greedy 디코딩이므로 같은 모델, 같은 입력이면 결과가 동일
+    - (model_version, case, insight_number, input_string) 단위로 clean_insight 이후 결과 저장
+    """
+    __tablename__ = 'insight_cache'
+    model_version = Column(String, primary_key=True)
+    case = Column(String, primary_key=True)
+    insight_number = Column(Integer, primary_key=True)
+    input_string = Column(String, primary_key=True)
+    result = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+class RecommendationJob(Base):
+    """
+    추천 생성 작업 (모든 워커 프로세스가 공유)
+    - status : queued -> running -> done / failed
+    - coalesced : 대기 중에 합쳐진 추가 요청 수
+    - 워커는 가장 오래된 queued 작업을 running으로 바꾸면서 가져가므로 어느 프로세스에 등록된 작업이든 실행
+    """
+    __tablename__ = 'recommendation_job'
+    job_id = Column(String(32), primary_key=True)
+    device_id = Column(BigInteger, nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    coalesced = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    __table_args__ = (
+        Index("ix_recommendation_job_status_created_at", "status", "created_at"),
+        Index("ix_recommendation_job_device_status", "device_id", "status"),
+    )
+
+    def to_dict(self):
+        return {
+            "jobId": self.job_id,
+            "deviceId": self.device_id,
+            "status": self.status,
+            "coalesced": self.coalesced,
+            "error": self.error,
+            "createdAt": self.created_at.isoformat(),
+            "startedAt": self.started_at.isoformat() if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None
+        }
\ No newline at end of file
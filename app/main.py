@@ -1,13 +1,23 @@
+import time
+IMPORT_STARTED_AT = time.perf_counter()
+
+import asyncio
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.connection import init_db
-from app.routers import report
-from app.models.inference import load_model
+from app.database.connection import init_db, dispose_engines
+from app.routers import health, report
+from app.services.job_queue import RecommendationQueue
+from app.services import metrics
+from app.services.recommendation import SERVING_MODE
+from app.services.startup import StartupReport
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+startup_report = StartupReport(IMPORT_STARTED_AT)
+startup_report.record("import_app", time.perf_counter() - IMPORT_STARTED_AT)
+
 app = FastAPI(
     title="AI Inference API",
     docs_url="/v1/ssafyA104/AI/docs",
@@ -27,22 +37,85 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    경로별 응답 시간 기록 (route는 path parameter가 치환되기 전의 경로 템플릿)
+    """
+    started_at = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.http_request_seconds.observe(
+            time.perf_counter() - started_at,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
 app.include_router(
     report.router,
     prefix="/v1/ssafyA104/AI"
 )
 
-tokenizer, model = None, None
+app.include_router(health.router)
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    """
+    DB 초기화와 작업 큐 시작까지만 기다리고, AI 모델은 백그라운드에서 로드
+    - 모델 로드 중에도 데이터 수신 API는 동작하고, 추천 생성 작업은 로드가 끝날 때까지 대기
+    - 로드 완료 여부는 /readyz로 확인
+    """
+    app.state.startup_report = startup_report
+    app.state.engine = None
+    app.state.model_ready = asyncio.Event()
+
+    with startup_report.phase("init_db"):
+        init_db()
     logger.info("Application startup complete. Database initialized.")
 
-    tokenizer, model = load_model()
-    if model:
-        app.state.tokenizer = tokenizer
-        app.state.model = model
-        logger.info("AI Model loaded successfully and stored in app.state.")
+    with startup_report.phase("start_queue"):
+        app.state.recommendation_queue = RecommendationQueue(lambda: app.state.engine, ready=app.state.model_ready)
+        app.state.recommendation_queue.start()
+        metrics.queue_depth.set_function(lambda: app.state.recommendation_queue.depth())
+        metrics.queue_running.set_function(lambda: app.state.recommendation_queue.running)
+
+    if SERVING_MODE == "template":
+        logger.info("SERVING_MODE is template. Skipping AI model load.")
+        app.state.model_ready.set()
+        startup_report.mark_model("skipped")
     else:
-        logger.error("Failed to load AI model. Check logs for details.")
\ No newline at end of file
+        app.state.model_loader = asyncio.create_task(load_engine_in_background())
+
+async def load_engine_in_background():
+    from app.models.engine import InferenceEngine
+
+    try:
+        with startup_report.phase("load_model"):
+            engine = await asyncio.to_thread(InferenceEngine.get_or_load)
+    except Exception as e:
+        logger.error("Unexpected error while loading AI model: %s", str(e), exc_info=True)
+        engine = None
+
+    app.state.engine = engine
+    if engine:
+        startup_report.phases.update(getattr(engine, "load_timings", {}))
+        logger.info("AI inference engine loaded successfully and stored in app.state.")
+        startup_report.mark_model("ready")
+    else:
+        logger.error("Failed to load AI model. Check logs for details.")
+        startup_report.mark_model("failed")
+    app.state.model_ready.set()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    loader = getattr(app.state, "model_loader", None)
+    if loader and not loader.done():
+        loader.cancel()
+    await app.state.recommendation_queue.stop()
+    await dispose_engines()
\ No newline at end of file
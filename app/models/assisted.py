@@ -0,0 +1,83 @@
+import os
+import logging
+from typing import Optional
+import torch
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+"""
+ASSISTED_DECODING (PyTorch 백엔드)
+- none : 일반 greedy 디코딩 (기본값)
+- prompt-lookup : 프롬프트(few-shot 예시)에서 직전 n-gram과 일치하는 구간을 찾아 이어지는 토큰을 후보로 제안
+- draft-model : 같은 tokenizer를 쓰는 작은 모델(DRAFT_MODEL_PATH)이 후보 토큰을 제안
+후보 토큰은 본 모델이 한 번의 forward로 검증하고, greedy 결과와 일치하는 토큰까지만 채택하므로 출력은 일반 디코딩과 같음
+(HuggingFace assisted generation은 배치 크기 1만 지원하므로 프롬프트별로 생성)
+"""
+ASSISTED_DECODING_MODES = ("none", "prompt-lookup", "draft-model")
+ASSISTED_DECODING = os.getenv("ASSISTED_DECODING", "none")
+PROMPT_LOOKUP_NUM_TOKENS = int(os.getenv("PROMPT_LOOKUP_NUM_TOKENS", "10"))
+PROMPT_LOOKUP_MAX_NGRAM = int(os.getenv("PROMPT_LOOKUP_MAX_NGRAM", "2"))
+DRAFT_MODEL_PATH = os.getenv("DRAFT_MODEL_PATH", "./app/models/puricat-report-draft")
+NUM_ASSISTANT_TOKENS = int(os.getenv("NUM_ASSISTANT_TOKENS", "5"))
+ASSISTED_SELF_CHECK = os.getenv("ASSISTED_SELF_CHECK", "true").lower() == "true"
+
+class AssistedDecoding:
+    """
+    model.generate에 추가로 넘길 assisted generation 인자
+    - generate_kwargs : prompt_lookup_num_tokens / max_matching_ngram_size 또는 assistant_model / num_assistant_tokens
+    """
+    def __init__(self, mode: str, generate_kwargs: dict):
+        self.mode = mode
+        self.generate_kwargs = generate_kwargs
+
+    @classmethod
+    def load(cls, mode: str = ASSISTED_DECODING) -> Optional["AssistedDecoding"]:
+        if mode not in ASSISTED_DECODING_MODES:
+            logger.error("Unknown ASSISTED_DECODING %s (available: %s); using plain decoding", mode, ", ".join(ASSISTED_DECODING_MODES))
+            return None
+
+        if mode == "prompt-lookup":
+            return cls(mode, {
+                "prompt_lookup_num_tokens": PROMPT_LOOKUP_NUM_TOKENS,
+                "max_matching_ngram_size": PROMPT_LOOKUP_MAX_NGRAM
+            })
+
+        if mode == "draft-model":
+            from transformers import AutoModelForCausalLM
+
+            try:
+                draft_model = AutoModelForCausalLM.from_pretrained(
+                    os.path.abspath(DRAFT_MODEL_PATH),
+                    device_map=None,
+                    torch_dtype=torch.float32,
+                    low_cpu_mem_usage=True
+                )
+            except Exception as e:
+                logger.error("Failed to load draft model from %s; using plain decoding: %s", DRAFT_MODEL_PATH, str(e))
+                return None
+            draft_model.eval()
+            return cls(mode, {
+                "assistant_model": draft_model,
+                "num_assistant_tokens": NUM_ASSISTANT_TOKENS
+            })
+
+        return None
+
+    def describe(self) -> dict:
+        return {
+            "mode": self.mode,
+            **{key: value for key, value in self.generate_kwargs.items() if key != "assistant_model"}
+        }
+
+def check_assisted_outputs(engine) -> list:
+    """
+    mock 데이터(two_week) 프롬프트에 대해 일반 디코딩과 assisted decoding의 출력이 다른 프롬프트 목록 (비어 있으면 통과)
+    """
+    from app.models.fewshot_prompt import generate_fewshot_prompt
+    from app.models.model_test import MOCK_DATA
+
+    prompts = [generate_fewshot_prompt(MOCK_DATA[2], "two_week", insight_number) for insight_number in range(1, 5)]
+    expected = engine.generate_plain(prompts)
+    actual = [engine.generate_assisted(prompt) for prompt in prompts]
+    return [prompt for prompt, a, b in zip(prompts, expected, actual) if a != b]
\ No newline at end of file
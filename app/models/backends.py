@@ -0,0 +1,134 @@
+import os
+import logging
+import torch
+from transformers import GenerationConfig, AutoTokenizer, AutoModelForCausalLM
+from app.models.quantization import PRECISIONS, MODEL_PRECISION, PRECISION_SELF_CHECK, apply_precision, convert_with_self_check
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+"""
+INFERENCE_BACKEND
+- pytorch : PyTorch 모델 (./app/models/puricat-report)
+- onnx : ONNX Runtime 모델 (python -m app.models.convert_onnx 로 변환한 ./app/models/puricat-report-onnx)
+"""
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")
+MODEL_PATH = os.getenv("MODEL_PATH", "./app/models/puricat-report")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "./app/models/puricat-report-onnx")
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "model.onnx")
+
+def greedy_generation_config():
+    return GenerationConfig(
+        do_sample=False,
+        temperature=None,
+        top_p=None,
+        top_k=None
+    )
+
+class InferenceBackend:
+    """
+    추론 백엔드 인터페이스
+    - load() : (tokenizer, model) 반환, model은 HuggingFace generate()를 지원해야 함
+    - supports_prefix_cache : past_key_values를 직접 넘겨 prefix KV cache를 재사용할 수 있는지 여부
+    - supports_assisted_decoding : HuggingFace assisted generation(prompt lookup / draft model)을 사용할 수 있는지 여부
+    - version : 결과 캐시 키에 포함되는 백엔드 식별자 (백엔드마다 출력이 달라질 수 있으므로)
+    """
+    name = "base"
+    supports_prefix_cache = False
+    supports_assisted_decoding = False
+
+    @property
+    def version(self) -> str:
+        return self.name
+
+    def load(self):
+        raise NotImplementedError
+
+class PyTorchBackend(InferenceBackend):
+    name = "pytorch"
+    supports_prefix_cache = True
+    supports_assisted_decoding = True
+
+    def __init__(self, model_path: str = MODEL_PATH, precision: str = MODEL_PRECISION, self_check: bool = PRECISION_SELF_CHECK):
+        if precision not in PRECISIONS:
+            logger.error("Unknown MODEL_PRECISION %s (available: %s); using fp32", precision, ", ".join(PRECISIONS))
+            precision = "fp32"
+        self.model_path = os.path.abspath(model_path)
+        self.precision = precision
+        self.self_check = self_check
+
+    @property
+    def version(self) -> str:
+        return f"{self.name}:{self.precision}"
+
+    def load(self):
+        tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+
+        if self.precision == "fp32" or (self.precision == "bf16" and not self.self_check):
+            dtype = torch.bfloat16 if self.precision == "bf16" else torch.float32
+            return tokenizer, self.load_model(dtype)
+
+        model = self.load_model(torch.float32)
+        if not self.self_check:
+            return tokenizer, apply_precision(model, self.precision)
+
+        converted, mismatches = convert_with_self_check(tokenizer, model, self.precision)
+        if converted is not None:
+            return tokenizer, converted
+
+        logger.error(
+            "Precision %s changed %s mock output(s); falling back to fp32",
+            self.precision, len(mismatches)
+        )
+        del model
+        self.precision = "fp32"
+        return tokenizer, self.load_model(torch.float32)
+
+    def load_model(self, dtype):
+        model = AutoModelForCausalLM.from_pretrained(
+            self.model_path,
+            device_map=None,
+            torch_dtype=dtype,
+            low_cpu_mem_usage=True
+        )
+        model.generation_config = greedy_generation_config()
+        model.eval()
+        return model
+
+class OnnxRuntimeBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(self, model_path: str = ONNX_MODEL_PATH, file_name: str = ONNX_MODEL_FILE):
+        self.model_path = os.path.abspath(model_path)
+        self.file_name = file_name
+
+    @property
+    def version(self) -> str:
+        return f"{self.name}:{self.file_name}"
+
+    def load(self):
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError as e:
+            raise RuntimeError("ONNX backend requires optimum[onnxruntime]. Install it with pip install optimum[onnxruntime].") from e
+
+        tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+        model = ORTModelForCausalLM.from_pretrained(
+            self.model_path,
+            file_name=self.file_name,
+            provider="CPUExecutionProvider",
+            use_cache=True,
+            use_io_binding=False
+        )
+        model.generation_config = greedy_generation_config()
+        return tokenizer, model
+
+BACKENDS = {
+    PyTorchBackend.name: PyTorchBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend
+}
+
+def get_backend(name: str = INFERENCE_BACKEND) -> InferenceBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name} (available: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import logging
+import argparse
+from transformers import AutoTokenizer
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+def export_onnx(model_path: str, output_dir: str):
+    """
+    PyTorch 모델을 past_key_values 입출력을 포함한 ONNX 모델로 변환
+    - task : text-generation-with-past (디코딩 시 KV cache 재사용)
+    - output_dir에 model.onnx, config, tokenizer 저장
+    """
+    from optimum.exporters.onnx import main_export
+
+    logger.info("Exporting %s to ONNX (%s)...", model_path, output_dir)
+    main_export(
+        model_name_or_path=model_path,
+        output=output_dir,
+        task="text-generation-with-past",
+        device="cpu",
+        framework="pt"
+    )
+    AutoTokenizer.from_pretrained(model_path).save_pretrained(output_dir)
+    logger.info("ONNX export completed: %s", output_dir)
+
+def quantize_onnx(output_dir: str, per_channel: bool = True):
+    """
+    ONNX 모델에 동적 int8 양자화 적용
+    - 가중치는 int8로 저장, 활성값은 실행 시점에 양자화
+    - output_dir/model_quantized.onnx 로 저장 (ONNX_MODEL_FILE=model_quantized.onnx 로 사용)
+    """
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    logger.info("Applying dynamic int8 quantization to %s...", output_dir)
+    quantizer = ORTQuantizer.from_pretrained(output_dir, file_name="model.onnx")
+    quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=per_channel)
+    quantizer.quantize(
+        save_dir=output_dir,
+        quantization_config=quantization_config,
+        use_external_data_format=True
+    )
+    logger.info("Quantized model saved: %s", os.path.join(output_dir, "model_quantized.onnx"))
+
+def main():
+    parser = argparse.ArgumentParser(description="puricat-report 모델 ONNX 변환 및 int8 양자화")
+    parser.add_argument("--model-path", default="./app/models/puricat-report")
+    parser.add_argument("--output-dir", default="./app/models/puricat-report-onnx")
+    parser.add_argument("--quantize", action="store_true", help="동적 int8 양자화 모델도 함께 생성")
+    parser.add_argument("--no-per-channel", action="store_true", help="per-tensor 양자화 사용")
+    parser.add_argument("--overwrite", action="store_true", help="기존 output-dir 삭제 후 변환")
+    args = parser.parse_args()
+
+    model_path = os.path.abspath(args.model_path)
+    output_dir = os.path.abspath(args.output_dir)
+
+    if os.path.exists(output_dir) and args.overwrite:
+        shutil.rmtree(output_dir)
+
+    if not os.path.exists(os.path.join(output_dir, "model.onnx")):
+        export_onnx(model_path, output_dir)
+    else:
+        logger.info("ONNX model already exists in %s, skipping export", output_dir)
+
+    if args.quantize:
+        quantize_onnx(output_dir, per_channel=not args.no_per_channel)
+
+# python -m app.models.convert_onnx --quantize
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import gc
+import os
+import time
+import logging
+from threading import Thread
+from typing import Iterator, List, Optional
+import torch
+from transformers import GenerationConfig, TextIteratorStreamer
+from transformers.generation.streamers import BaseStreamer
+from app.models.inference import load_model
+from app.models.assisted import ASSISTED_DECODING, ASSISTED_SELF_CHECK, AssistedDecoding, check_assisted_outputs
+from app.models.backends import INFERENCE_BACKEND, get_backend
+from app.models.prefix_cache import PrefixCache
+from app.models.prompt_ids import PromptIds
+from app.models.result_cache import ResultCache, MODEL_VERSION
+from app.services.metrics import observe_generation, stage_timer
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+PREFIX_CACHE_ENABLED = os.getenv("PREFIX_CACHE_ENABLED", "true").lower() == "true"
+
+preloaded_engine: Optional["InferenceEngine"] = None
+
+class TimingStreamer(BaseStreamer):
+    """
+    model.generate의 streamer로 전달하여 prefill / decode 시간과 생성 토큰 수를 메트릭으로 기록
+    - 첫 put은 프롬프트, 두 번째 put(첫 생성 토큰)까지가 prefill, 이후 end까지가 decode
+    - 종료된 행이 채우는 pad 토큰은 생성 토큰 수에서 제외
+    - inner가 있으면 받은 값을 그대로 전달 (TextIteratorStreamer 등)
+    """
+    def __init__(self, pad_token_id: Optional[int] = None, inner: Optional[BaseStreamer] = None):
+        self.pad_token_id = pad_token_id
+        self.inner = inner
+        self.started_at = None
+        self.first_token_at = None
+        self.first_tokens = 0
+        self.tokens = 0
+
+    def put(self, value):
+        now = time.perf_counter()
+        if self.started_at is None:
+            self.started_at = now
+        else:
+            count = int((value != self.pad_token_id).sum()) if self.pad_token_id is not None else value.numel()
+            if self.first_token_at is None:
+                self.first_token_at = now
+                self.first_tokens = count
+            self.tokens += count
+        if self.inner is not None:
+            self.inner.put(value)
+
+    def end(self):
+        finished_at = time.perf_counter()
+        if self.inner is not None:
+            self.inner.end()
+        if self.started_at is None:
+            return
+        prefill_seconds = (self.first_token_at or finished_at) - self.started_at
+        decode_seconds = finished_at - self.first_token_at if self.first_token_at is not None else None
+        observe_generation(prefill_seconds, decode_seconds, self.tokens, self.tokens - self.first_tokens)
+
+class InferenceEngine:
+    """
+    서버 수명 동안 유지되는 추론 엔진
+    - tokenizer, model, 생성 설정, 고정 prefix의 token ID를 한 번만 생성
+    - model은 INFERENCE_BACKEND(pytorch / onnx)에 따라 로드
+    - 요청마다 파이프라인을 다시 만들지 않고 generate(prompts)로 추론 수행
+    """
+    def __init__(self, tokenizer, model, prefix_cache: Optional[PrefixCache] = None, result_cache: Optional[ResultCache] = None, backend_name: str = "pytorch", prompt_ids: Optional[PromptIds] = None, assisted: Optional[AssistedDecoding] = None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.backend_name = backend_name
+        self.prefix_cache = prefix_cache
+        self.result_cache = result_cache
+        self.prompt_ids = prompt_ids
+        self.assisted = assisted
+        self.generation_config = GenerationConfig(
+            max_new_tokens=200,
+            do_sample=False,
+            temperature=None,
+            top_p=None,
+            top_k=None,
+            no_repeat_ngram_size=3,
+            repetition_penalty=1.2,
+            eos_token_id=tokenizer.eos_token_id,
+            pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id else 0
+        )
+        self.load_timings = {}
+
+    @classmethod
+    def load(cls, backend_name: str = INFERENCE_BACKEND) -> Optional["InferenceEngine"]:
+        try:
+            backend = get_backend(backend_name)
+        except ValueError as e:
+            logger.error(str(e))
+            return None
+
+        started_at = time.perf_counter()
+        tokenizer, model = load_model(backend)
+        if model is None:
+            return None
+        load_timings = {"load_weights": round(time.perf_counter() - started_at, 3)}
+
+        prefix_cache = None
+        if PREFIX_CACHE_ENABLED and backend.supports_prefix_cache:
+            started_at = time.perf_counter()
+            try:
+                prefix_cache = PrefixCache(tokenizer, model).build()
+            except Exception as e:
+                logger.error(f"Failed to build prefix cache, continuing without it: {e}", exc_info=True)
+            load_timings["build_prefix_cache"] = round(time.perf_counter() - started_at, 3)
+
+        started_at = time.perf_counter()
+        prompt_ids = PromptIds(tokenizer).build()
+        load_timings["compile_prompt_ids"] = round(time.perf_counter() - started_at, 3)
+
+        result_cache = ResultCache(model_version=f"{MODEL_VERSION}/{backend.version}")
+        engine = cls(tokenizer, model, prefix_cache, result_cache, backend_name=backend.name, prompt_ids=prompt_ids)
+
+        if ASSISTED_DECODING != "none":
+            started_at = time.perf_counter()
+            if backend.supports_assisted_decoding:
+                engine.enable_assisted_decoding(ASSISTED_DECODING)
+            else:
+                logger.warning("Backend %s does not support assisted decoding; using plain decoding", backend.name)
+            load_timings["assisted_decoding"] = round(time.perf_counter() - started_at, 3)
+
+        engine.load_timings = load_timings
+        return engine
+
+    def enable_assisted_decoding(self, mode: str = ASSISTED_DECODING, self_check: bool = ASSISTED_SELF_CHECK) -> bool:
+        """
+        assisted decoding 사용 (prompt-lookup / draft-model)
+        - self_check이면 mock 프롬프트로 일반 디코딩과 출력이 같은지 확인하고, 다르면 사용하지 않음
+        """
+        assisted = AssistedDecoding.load(mode)
+        if assisted is None:
+            return False
+
+        self.assisted = assisted
+        if self_check:
+            try:
+                mismatches = check_assisted_outputs(self)
+            except Exception as e:
+                logger.error("Assisted decoding self-check failed; using plain decoding: %s", str(e), exc_info=True)
+                self.assisted = None
+                return False
+            if mismatches:
+                logger.error("Assisted decoding changed %s self-check output(s); using plain decoding", len(mismatches))
+                self.assisted = None
+                return False
+
+        logger.info("Assisted decoding enabled: %s", assisted.describe())
+        return True
+
+    @classmethod
+    def preload(cls, backend_name: str = INFERENCE_BACKEND) -> Optional["InferenceEngine"]:
+        """
+        gunicorn --preload 마스터 프로세스에서 워커 fork 전에 한 번만 로드 (gunicorn.conf.py)
+        - 워커는 fork로 모델 가중치 페이지를 공유하므로 워커 수만큼 모델을 다시 로드하지 않음
+        - OpenMP 스레드 풀이 만들어진 상태에서 fork하면 워커가 멈출 수 있으므로 로드(자가 검증, prefix cache 생성 포함)는 단일 스레드로 수행
+        - gc.freeze()로 로드된 객체를 GC 추적 대상에서 제외하여 워커의 GC가 공유 페이지를 건드려 복사되지 않도록 함
+        """
+        global preloaded_engine
+
+        num_threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+        try:
+            preloaded_engine = cls.load(backend_name)
+        finally:
+            torch.set_num_threads(num_threads)
+
+        gc.collect()
+        gc.freeze()
+        return preloaded_engine
+
+    @classmethod
+    def get_or_load(cls, backend_name: str = INFERENCE_BACKEND) -> Optional["InferenceEngine"]:
+        if preloaded_engine is not None:
+            logger.info("Using inference engine preloaded before fork (pid %s)", os.getpid())
+            return preloaded_engine
+        return cls.load(backend_name)
+
+    def generate(self, prompts: List[str]) -> List[str]:
+        """
+        프롬프트 여러 개를 생성하여 '프롬프트 + 생성 결과' 형태로 반환
+        - assisted decoding을 사용하면 프롬프트별로 생성하고, 실패하면 일반 디코딩으로 다시 생성
+        """
+        if self.assisted:
+            try:
+                return [self.generate_assisted(prompt) for prompt in prompts]
+            except Exception as e:
+                logger.error("Assisted decoding failed, falling back to plain decoding: %s", str(e), exc_info=True)
+        return self.generate_plain(prompts)
+
+    def generate_assisted(self, prompt: str) -> str:
+        return self.generate_plain([prompt], **self.assisted.generate_kwargs)[0]
+
+    def generate_plain(self, prompts: List[str], **generate_kwargs) -> List[str]:
+        """
+        프롬프트 여러 개를 left-padding 후 한 번의 model.generate 호출로 디코딩
+        - 프롬프트가 모두 캐시된 prefix로 시작하면 suffix만 prefill
+        """
+        inputs = self.prepare_inputs(prompts)
+
+        with torch.no_grad():
+            output_ids = self.model.generate(
+                **inputs,
+                generation_config=self.generation_config,
+                streamer=TimingStreamer(self.generation_config.pad_token_id),
+                **generate_kwargs
+            )
+
+        prompt_length = inputs["input_ids"].shape[1]
+        completions = self.tokenizer.batch_decode(output_ids[:, prompt_length:], skip_special_tokens=True)
+        return [prompt + completion for prompt, completion in zip(prompts, completions)]
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        프롬프트 하나에 대해 생성된 텍스트를 토큰 단위로 yield
+        - model.generate는 별도 스레드에서 실행하고 TextIteratorStreamer로 결과를 받음
+        - assisted decoding이 텍스트를 내보내기 전에 실패하면 일반 디코딩으로 다시 생성
+        """
+        if not self.assisted:
+            yield from self.stream_with([prompt])
+            return
+
+        started = False
+        try:
+            for text in self.stream_with([prompt], **self.assisted.generate_kwargs):
+                started = started or bool(text)
+                yield text
+            return
+        except Exception as e:
+            if started:
+                raise e
+            logger.error("Assisted decoding failed, falling back to plain decoding: %s", str(e), exc_info=True)
+        yield from self.stream_with([prompt])
+
+    def stream_with(self, prompts: List[str], **generate_kwargs) -> Iterator[str]:
+        inputs = self.prepare_inputs(prompts)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        timing_streamer = TimingStreamer(self.generation_config.pad_token_id, inner=streamer)
+        errors = []
+
+        def run():
+            try:
+                with torch.no_grad():
+                    self.model.generate(**inputs, generation_config=self.generation_config, streamer=timing_streamer, **generate_kwargs)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = Thread(target=run, daemon=True)
+        thread.start()
+        for text in streamer:
+            yield text
+        thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def prepare_inputs(self, prompts: List[str]):
+        with stage_timer("tokenization"):
+            match = self.prefix_cache.match(prompts) if self.prefix_cache else None
+            if match:
+                input_ids, attention_mask, past_key_values = self.prefix_cache.prepare_inputs(prompts, *match)
+                return {"input_ids": input_ids, "attention_mask": attention_mask, "past_key_values": past_key_values}
+            encoded = self.prompt_ids.encode(prompts) if self.prompt_ids else None
+            if encoded:
+                return encoded
+            return self.tokenizer(prompts, return_tensors="pt", padding=True, padding_side="left")
@@ -1,12 +1,21 @@
 import logging
-from typing import Optional, List, Dict, Any
-from langchain.prompts import PromptTemplate, FewShotPromptTemplate
-from langchain_core.example_selectors import LengthBasedExampleSelector
+from typing import Optional, List, Dict, Any, Tuple
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 EXAMPLE_TEMPLATE = "입력: {input}\n출력: {output}"
+EXAMPLE_SEPARATOR = "\n\n"
+PROMPT_INSTRUCTION = (
+    "당신의 역할은 주어진 예시를 그대로 따라, 동일한 단어와 문장구조로 요약을 생성하는 것입니다.\n"
+    "출력은 반드시 아래 예시와 동일한 형식, 단어, 구문을 사용하여 한 문장으로 작성되어야 합니다. "
+    "추가적인 단어나 설명은 반드시 제외하세요.\n"
+    "아래 예시들을 참고하여 결과를 생성하세요.\n"
+)
+PROMPT_HEADER = "\n모델추론결과\n"
+PROMPT_SUFFIX = "입력: {input}\n출력:"
+PROMPT_CASES = ("one_week", "two_week")
+INSIGHT_NUMBERS = (1, 2, 3, 4)
 
 def generate_input_string(case: str, insight_number: int, data: Dict[str, Any]) -> str:
     try:
@@ -74,56 +83,39 @@ def generate_prefix_string(case: str, insight_number: int) -> str:
         logger.error(f"Unexpected error in generate_input_string: {e}")
     return ""
 
-def generate_fewshot_prompt(data: Dict[str, Any], case: str, insight_number: int) -> Optional[FewShotPromptTemplate]:
+def compile_prompt_prefix(case: str, insight_number: int) -> str:
+    """
+    지시문 + 예시 + '모델추론결과' 줄까지의 고정 prefix
+    - LangChain FewShotPromptTemplate(example_separator="\n\n")의 출력과 동일한 문자열
+    - 예시는 모두 LengthBasedExampleSelector(max_length=2000) 길이 안에 들어가므로 항상 전부 사용
+    """
+    examples = [EXAMPLE_TEMPLATE.format(**example) for example in generate_examples(case, insight_number)]
+    return EXAMPLE_SEPARATOR.join([PROMPT_INSTRUCTION, *examples, PROMPT_HEADER])
+
+def generate_prompt_prefix(case: str, insight_number: int) -> str:
+    """
+    기기별 입력과 무관한 고정 prefix
+    - generate_prompt_prefix(...) + generate_prompt_suffix(input) == generate_fewshot_prompt(...)
+    """
+    return PROMPT_PREFIXES[(case, insight_number)]
+
+def generate_prompt_suffix(input_string: str) -> str:
+    return PROMPT_SUFFIX.format(input=input_string)
+
+def generate_fewshot_prompt(data: Dict[str, Any], case: str, insight_number: int) -> Optional[str]:
     if case == "no_data":
         return None
         
     try:
-        examples = generate_examples(case, insight_number)
         input_string = generate_input_string(case, insight_number, data)
-        prefix_string = generate_prefix_string(case, insight_number)
         
         if not input_string:
             logger.warning(f"Empty input string generated for case {case}, insight {insight_number}")
             return None
-        
-        example_prompt = PromptTemplate(
-            input_variables=["input", "output"],
-            template=EXAMPLE_TEMPLATE
-        )
-        
-        example_selector = LengthBasedExampleSelector(
-            examples=examples,
-            example_prompt=example_prompt,
-            max_length=2000
-        )
-
-        few_shot_prompt = FewShotPromptTemplate(
-            example_selector=example_selector,
-            example_prompt=example_prompt,
-            # prefix=(
-            #     "당신의 역할은 주어진 예시를 그대로 따라, 주어진 단어와 문장구조로 요약을 생성하는 것입니다.\n"
-            #     + prefix_string +
-            #     "추가적인 단어나 설명은 반드시 제외하세요.\n"
-            #     "아래 예시들을 참고하여 결과를 생성하세요."
-            # ),
-            prefix=(
-                "당신의 역할은 주어진 예시를 그대로 따라, 동일한 단어와 문장구조로 요약을 생성하는 것입니다.\n"
-                "출력은 반드시 아래 예시와 동일한 형식, 단어, 구문을 사용하여 한 문장으로 작성되어야 합니다. "
-                "추가적인 단어나 설명은 반드시 제외하세요.\n"
-                "아래 예시들을 참고하여 결과를 생성하세요.\n"
-            ),
 
-            suffix="\n모델추론결과\n입력: {input}\n출력:",
-            input_variables=["input"]
-        )
-        
-        final_prompt = few_shot_prompt.format(input=input_string)
-        print("\n\n\n")
-        print(str(insight_number) + ". 프 롬 프 트")
-        print(str(final_prompt))
-        print("\n")
-        return str(final_prompt)
+        final_prompt = PROMPT_PREFIXES[(case, insight_number)] + generate_prompt_suffix(input_string)
+        logger.debug("%s. 프롬프트\n%s", insight_number, final_prompt)
+        return final_prompt
 
     except Exception as e:
         logger.error(f"Error generating few-shot prompt: {e}")
@@ -239,4 +231,14 @@ def generate_examples(case: str, insight_number: int) -> List[Dict[str, str]]:
                     }
             examples.append(example)
     
-    return examples
\ No newline at end of file
+    return examples
+
+"""
+(case, insight_number) 8가지 조합의 prefix는 import 시 한 번만 생성
+- 요청 시에는 PROMPT_PREFIXES[(case, insight_number)] + generate_prompt_suffix(input) 문자열 연결만 수행
+"""
+PROMPT_PREFIXES: Dict[Tuple[str, int], str] = {
+    (case, insight_number): compile_prompt_prefix(case, insight_number)
+    for case in PROMPT_CASES
+    for insight_number in INSIGHT_NUMBERS
+}
\ No newline at end of file
@@ -1,53 +1,32 @@
-import os
 import re
 import json
 import logging
-import torch
-import transformers
 from datetime import datetime
-from transformers import GenerationConfig, pipeline, AutoTokenizer, AutoModelForCausalLM
-from langchain_huggingface import HuggingFacePipeline
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from typing import Dict, Any
 from sqlalchemy.orm import Session
-from fastapi import Request
-from app.database.crud import get_hourly_data
-from app.services.json_load import load_device_json
-from app.models.fewshot_prompt import generate_fewshot_prompt
+from app.database.crud import get_device_report
+from app.services.json_load import build_device_json
+from app.models.fewshot_prompt import generate_fewshot_prompt, generate_input_string
+from app.services.metrics import stage_timer, timed
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+"""
+torch / transformers는 모델을 로드할 때만 import
+- 이 모듈은 API 라우터에서 import되므로 서버 시작 시간에 영향을 주지 않도록 함
+"""
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
-transformers.utils.logging.set_verbosity_error()
-    
-def get_model_from_app_state(request: Request):
-    tokenizer = request.app.state.tokenizer
-    model = request.app.state.model
-    if tokenizer is None or model is None:
-        raise RuntimeError("AI Model is not loaded. Please check the startup logs.")
-    return tokenizer, model
-
-def load_model():
+
+def load_model(backend=None):
     try:
-        logger.info("Loading the AI inference model...")
-
-        # model_path = os.path.abspath("./app/models/fine_tuned_model_v3")
-        model_path = os.path.abspath("./app/models/puricat-report")
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-        model = AutoModelForCausalLM.from_pretrained(
-            model_path,
-            device_map=None,
-            torch_dtype=torch.float32,
-            low_cpu_mem_usage=True
-        )
-
-        model.generation_config = GenerationConfig(
-            do_sample=False,
-            temperature=None,
-            top_p=None,
-            top_k=None
-        )
+        import transformers
+        from app.models.backends import get_backend
+
+        transformers.utils.logging.set_verbosity_error()
+        backend = backend or get_backend()
+        logger.info("Loading the AI inference model (backend: %s)...", backend.name)
+
+        tokenizer, model = backend.load()
 
         logger.info("Model loaded successfully.")
         return tokenizer, model
@@ -56,34 +35,25 @@ def load_model():
         logger.error(f"Failed to load model: {e}", exc_info=True)
         return None, None
     
-def create_pipeline(model, tokenizer):
-    
-    return pipeline(
-        "text-generation",
-        model=model,
-        tokenizer=tokenizer,
-        device=-1,
-        max_new_tokens=200,
-        do_sample=False,
-        no_repeat_ngram_size=3,
-        eos_token_id=tokenizer.eos_token_id,
-        pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id else 0,
-        repetition_penalty=1.2
-    )
-
-def get_data(db: Session, device_id: int):
+def get_data(db: Session, device_id: int, device=None):
+    """
+    - device : get_device_report로 이미 조회한 기기 (없으면 여기서 한 번 조회)
+    """
     try:
         logger.info("Fetching data for device_id: %s", device_id)
 
-        hourly_data = get_hourly_data(db, device_id)
+        if device is None:
+            device = get_device_report(db, device_id)
+        if not device:
+            logger.warning("No data found for device_id: %s", device_id)
+            return {}
+
+        hourly_data = device.hourly_data
         pm_current = 0.0
         if hourly_data:
             pm_current = round(hourly_data.pm_current, 1) if hourly_data and hourly_data.pm_current is not None else 0.0
 
-        daily_data = load_device_json(db, device_id)
-        if not daily_data:
-            logger.warning("No data found for device_id: %s", device_id)
-            return {}
+        daily_data = build_device_json(device)
         
         average_pm = daily_data.get("averagePm", [[0] * 7, [0] * 7])
         this_week_pm_values = [float(value) for value in average_pm[1] if isinstance(value, (int, float))]  
@@ -124,32 +94,171 @@ def check_data_validity(data):
     
     return "two_week" if last_week_exists else "one_week"
 
-def generate_recommendations(data, llm):
-    recommendations = []
-    
+def generate_raw_results(engine, prompts: Dict[int, str]) -> Dict[int, Any]:
+    """
+    insight_number별 프롬프트를 배치로 생성
+    - 배치 생성 실패 시 프롬프트별로 다시 생성하여 오류를 해당 인사이트에만 한정
+    - 실패한 인사이트는 결과 대신 Exception을 담아 반환
+    """
+    if not prompts:
+        return {}
+
+    insight_numbers = list(prompts.keys())
+    try:
+        raw_results = engine.generate([prompts[n] for n in insight_numbers])
+        return dict(zip(insight_numbers, raw_results))
+    except Exception as e:
+        logger.error(f"Batched generation failed, falling back to per-insight generation: {e}")
+
+    results = {}
+    for insight_number in insight_numbers:
+        try:
+            results[insight_number] = engine.generate([prompts[insight_number]])[0]
+        except Exception as e:
+            results[insight_number] = e
+    return results
+
+def create_entry(recommendation: str, case: str = None, input_string: str = None):
+    """
+    Recommendation.recommendations 항목
+    - input은 정상 생성된 인사이트에만 기록 (오류/템플릿 결과는 다음 요청에서 다시 생성)
+    """
+    return {"recommendation": recommendation, "case": case, "input": input_string}
+
+def find_reusable_entry(previous, insight_number: int, case: str, input_string: str):
+    if not previous or len(previous) < insight_number or not input_string:
+        return None
+    entry = previous[insight_number - 1]
+    if entry.get("input") == input_string and entry.get("case") == case:
+        return entry
+    return None
+
+def generate_recommendation_entries(data, engine, previous=None, on_insight=None):
+    """
+    인사이트 4개를 항목(create_entry) 형태로 생성
+    - previous와 case, 입력 문자열이 같은 인사이트는 다시 생성하지 않고 재사용
+    - 결과 캐시에 있는 인사이트는 sLLM을 호출하지 않음
+    - on_insight(index, entry) : 인사이트가 확정될 때마다 호출
+    """
     case = check_data_validity(data)
     if case == "no_data":
-        return ["아직 데이터가 충분하지 않습니다..."] * 4
+        return [create_entry("아직 데이터가 충분하지 않습니다...", case) for _ in range(4)]
     
+    result_cache = getattr(engine, "result_cache", None)
+    entries = {}
+    input_strings = {}
+    prompts = {}
     for insight_number in range(1, 5):
-        formatted_prompt = generate_fewshot_prompt(data, case, insight_number)
-        if not formatted_prompt:
-            recommendations.append("아직 데이터가 충분하지 않습니다...")
+        input_strings[insight_number] = generate_input_string(case, insight_number, data)
+
+        reusable = find_reusable_entry(previous, insight_number, case, input_strings[insight_number])
+        if reusable:
+            entries[insight_number] = reusable
+            if on_insight:
+                on_insight(insight_number - 1, reusable)
+            continue
+
+        if result_cache and input_strings[insight_number]:
+            cached = result_cache.get(case, insight_number, input_strings[insight_number])
+            if cached is not None:
+                entries[insight_number] = create_entry(cached, case, input_strings[insight_number])
+                if on_insight:
+                    on_insight(insight_number - 1, entries[insight_number])
+                continue
+
+        with stage_timer("prompt_construction"):
+            formatted_prompt = generate_fewshot_prompt(data, case, insight_number)
+        if formatted_prompt:
+            prompts[insight_number] = formatted_prompt
+
+    logger.info("Generating %s of 4 insights (case: %s)", len(prompts), case)
+    raw_results = generate_raw_results(engine, prompts)
+
+    for insight_number in range(1, 5):
+        if insight_number in entries:
+            continue
+
+        if insight_number not in prompts:
+            entries[insight_number] = create_entry("아직 데이터가 충분하지 않습니다...", case)
             continue
 
         try:
-            chain = RunnablePassthrough() | llm | StrOutputParser()
-            raw_result = chain.invoke(formatted_prompt)
+            raw_result = raw_results[insight_number]
+            if isinstance(raw_result, Exception):
+                raise raw_result
             result = clean_insight(raw_result)
-            recommendations.append(result)
-            print(result)
+            entries[insight_number] = create_entry(result, case, input_strings[insight_number])
+            logger.debug("Insight %s: %s", insight_number, result)
+
+            if on_insight:
+                on_insight(insight_number - 1, entries[insight_number])
+
+            if result_cache:
+                result_cache.put(case, insight_number, input_strings[insight_number], result)
 
         except Exception as e:
             logger.error(f"Error generating insight {insight_number}: {e}")
-            recommendations.append("인사이트 생성 중 오류가 발생했습니다.")
+            entries[insight_number] = create_entry("인사이트 생성 중 오류가 발생했습니다.", case)
+
+    return [entries[insight_number] for insight_number in range(1, 5)]
+
+def generate_recommendations(data, engine, previous=None):
+    entries = generate_recommendation_entries(data, engine, previous)
+    return [entry["recommendation"] for entry in entries]
+
+def stream_recommendations(data, engine, previous=None):
+    """
+    인사이트를 생성하면서 (event, payload) 형태로 yield
+    - token : 생성 중인 텍스트 조각
+    - insight : clean_insight 후 완성된 인사이트 (payload["entry"]는 저장용 항목)
+    """
+    case = check_data_validity(data)
+    result_cache = getattr(engine, "result_cache", None)
+
+    for insight_number in range(1, 5):
+        if case == "no_data":
+            entry = create_entry("아직 데이터가 충분하지 않습니다...", case)
+            yield "insight", {"insightNumber": insight_number, "recommendation": entry["recommendation"], "entry": entry}
+            continue
+
+        input_string = generate_input_string(case, insight_number, data)
+        entry = find_reusable_entry(previous, insight_number, case, input_string)
+        if entry:
+            yield "insight", {"insightNumber": insight_number, "recommendation": entry["recommendation"], "entry": entry}
+            continue
 
-    return recommendations
+        if result_cache and input_string:
+            cached = result_cache.get(case, insight_number, input_string)
+            if cached is not None:
+                entry = create_entry(cached, case, input_string)
+                yield "insight", {"insightNumber": insight_number, "recommendation": cached, "entry": entry}
+                continue
 
+        with stage_timer("prompt_construction"):
+            formatted_prompt = generate_fewshot_prompt(data, case, insight_number)
+        if not formatted_prompt:
+            entry = create_entry("아직 데이터가 충분하지 않습니다...", case)
+            yield "insight", {"insightNumber": insight_number, "recommendation": entry["recommendation"], "entry": entry}
+            continue
+
+        try:
+            chunks = []
+            for text in engine.stream(formatted_prompt):
+                chunks.append(text)
+                yield "token", {"insightNumber": insight_number, "text": text}
+
+            result = clean_insight(formatted_prompt + "".join(chunks))
+            entry = create_entry(result, case, input_string)
+            if result_cache:
+                result_cache.put(case, insight_number, input_string, result)
+
+        except Exception as e:
+            logger.error(f"Error streaming insight {insight_number}: {e}")
+            entry = create_entry("인사이트 생성 중 오류가 발생했습니다.", case)
+
+        yield "insight", {"insightNumber": insight_number, "recommendation": entry["recommendation"], "entry": entry}
+
+@timed("clean_insight")
 def clean_insight(raw_output):
     if "출력:" in raw_output:
         content = raw_output.split("출력:")[-1].strip()
@@ -183,17 +292,22 @@ def log_inference_result(device_id: int, insight_number: int, prompt: str, resul
     }
     logger.info(f"Inference result:\n{json.dumps(log_data, indent=2, ensure_ascii=False)}")
 
-def run_inference(db: Session, device_id: int, request: Request):
+def run_inference(db: Session, device_id: int, engine, previous=None, data=None):
     try:
-        tokenizer, model = get_model_from_app_state(request)
-        pipe = create_pipeline(model, tokenizer)
-        llm = HuggingFacePipeline(pipeline=pipe)
+        if engine is None:
+            raise RuntimeError("AI Model is not loaded. Please check the startup logs.")
 
-        data = get_data(db, device_id)
-        recommendations = generate_recommendations(data, llm)
+        if data is None:
+            data = get_data(db, device_id)
+        entries = generate_recommendation_entries(data, engine, previous)
 
-        return {"deviceId": device_id, "recommendations": recommendations}
+        return {
+            "deviceId": device_id,
+            "recommendations": [entry["recommendation"] for entry in entries],
+            "entries": entries
+        }
 
     except Exception as e:
         logger.error(f"Error in run_inference: {e}")
-        return {"deviceId": device_id, "recommendations": ["서비스 오류가 발생했습니다."] * 4}
\ No newline at end of file
+        entries = [create_entry("서비스 오류가 발생했습니다.") for _ in range(4)]
+        return {"deviceId": device_id, "recommendations": [entry["recommendation"] for entry in entries], "entries": entries}
\ No newline at end of file
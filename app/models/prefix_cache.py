@@ -0,0 +1,103 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+import torch
+from transformers import DynamicCache
+from app.models.fewshot_prompt import PROMPT_CASES as CASES, INSIGHT_NUMBERS, generate_prompt_prefix
+from app.models.prompt_ids import splits_cleanly
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+def select_rows(past_key_values: DynamicCache, row_index) -> DynamicCache:
+    """
+    캐시된 prefix KV 중 row_index 행만 담은 새 DynamicCache
+    - 인덱싱으로 선택한 행만 새 텐서로 복사하므로 원본 캐시는 그대로 유지 (전체 4행을 deepcopy하지 않음)
+    """
+    selected = DynamicCache()
+    for layer_idx in range(len(past_key_values)):
+        selected.update(
+            past_key_values.key_cache[layer_idx][row_index],
+            past_key_values.value_cache[layer_idx][row_index],
+            layer_idx
+        )
+    return selected
+
+class PrefixEntry:
+    def __init__(self, prefixes: List[str], input_ids, attention_mask, past_key_values):
+        self.prefixes = prefixes
+        self.input_ids = input_ids
+        self.attention_mask = attention_mask
+        self.past_key_values = past_key_values
+
+    def rows_for(self, prompts: List[str]) -> Optional[List[int]]:
+        rows = []
+        for prompt in prompts:
+            row = next((i for i, prefix in enumerate(self.prefixes) if prompt.startswith(prefix)), None)
+            if row is None:
+                return None
+            rows.append(row)
+        return rows
+
+class PrefixCache:
+    """
+    (case, insight_number)별 고정 프롬프트 prefix의 KV cache
+    - 시작 시 case별로 insight 1~4의 prefix를 left-padding 후 한 번에 prefill하여 past_key_values 보관
+    - position_ids는 generate와 동일하게 attention_mask 기준으로 계산 (패딩 위치 제외)
+    - 요청 시에는 기기별 suffix('입력: ...\\n출력:')만 prefill
+    """
+    def __init__(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.entries: Dict[str, PrefixEntry] = {}
+
+    def build(self):
+        for case in CASES:
+            prefixes = [generate_prompt_prefix(case, insight_number) for insight_number in INSIGHT_NUMBERS]
+            if not all(splits_cleanly(self.tokenizer, prefix) for prefix in prefixes):
+                logger.warning("Prefix tokenization is not stable for case %s; prefix cache disabled for it", case)
+                continue
+
+            inputs = self.tokenizer(prefixes, return_tensors="pt", padding=True, padding_side="left")
+            position_ids = inputs["attention_mask"].long().cumsum(-1) - 1
+            position_ids.masked_fill_(inputs["attention_mask"] == 0, 1)
+            with torch.no_grad():
+                outputs = self.model(
+                    **inputs,
+                    position_ids=position_ids,
+                    past_key_values=DynamicCache(),
+                    use_cache=True
+                )
+
+            self.entries[case] = PrefixEntry(prefixes, inputs["input_ids"], inputs["attention_mask"], outputs.past_key_values)
+            logger.info("Prefix cache built for case %s (%s tokens)", case, inputs["input_ids"].shape[1])
+
+        return self
+
+    def match(self, prompts: List[str]) -> Optional[Tuple[PrefixEntry, List[int]]]:
+        for entry in self.entries.values():
+            rows = entry.rows_for(prompts)
+            if rows is not None:
+                return entry, rows
+        return None
+
+    def prepare_inputs(self, prompts: List[str], entry: PrefixEntry, rows: List[int]):
+        """
+        캐시된 prefix 토큰 뒤에 suffix 토큰을 이어 붙인 생성 입력
+        - suffix 길이가 달라 생기는 패딩은 prefix와 suffix 사이에 위치 (attention_mask로 가림)
+        - past_key_values는 요청에 필요한 행만 복사하여 사용 (생성 중 캐시가 갱신되므로)
+        """
+        row_index = torch.tensor(rows)
+        suffixes = [prompt[len(entry.prefixes[row]):] for prompt, row in zip(prompts, rows)]
+        suffix_inputs = self.tokenizer(
+            suffixes,
+            return_tensors="pt",
+            padding=True,
+            padding_side="left",
+            add_special_tokens=False
+        )
+
+        past_key_values = select_rows(entry.past_key_values, row_index)
+
+        input_ids = torch.cat([entry.input_ids[row_index], suffix_inputs["input_ids"]], dim=-1)
+        attention_mask = torch.cat([entry.attention_mask[row_index], suffix_inputs["attention_mask"]], dim=-1)
+        return input_ids, attention_mask, past_key_values
\ No newline at end of file
@@ -0,0 +1,59 @@
+import logging
+from typing import Dict, List, Optional
+import torch
+from app.models.fewshot_prompt import PROMPT_HEADER, PROMPT_PREFIXES, generate_prompt_suffix
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+def splits_cleanly(tokenizer, prefix: str) -> bool:
+    """
+    prefix와 suffix를 따로 토큰화해도 prefix + suffix 전체를 토큰화한 결과와 같은지 확인
+    """
+    suffix = generate_prompt_suffix("0")
+    joint = tokenizer(prefix + suffix)["input_ids"]
+    split = tokenizer(prefix)["input_ids"] + tokenizer(suffix, add_special_tokens=False)["input_ids"]
+    return joint == split
+
+class PromptIds:
+    """
+    고정 prefix(PROMPT_PREFIXES)의 token ID 테이블 (엔진 로드 시 한 번만 토큰화)
+    - 요청 시에는 기기별 suffix('입력: ...\\n출력:')만 토큰화하여 prefix ID 뒤에 붙이고 left-padding
+    - prefix cache를 쓰지 않는 경우(ONNX 백엔드, PREFIX_CACHE_ENABLED=false)의 입력 생성에 사용
+    """
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else 0
+        self.entries: Dict[str, List[int]] = {}
+
+    def build(self):
+        for (case, insight_number), prefix in PROMPT_PREFIXES.items():
+            if not splits_cleanly(self.tokenizer, prefix):
+                logger.warning("Prefix tokenization is not stable for %s/%s; tokenizing full prompts instead", case, insight_number)
+                continue
+            self.entries[prefix] = self.tokenizer(prefix)["input_ids"]
+        logger.info("Compiled token ids for %s of %s prompt prefixes", len(self.entries), len(PROMPT_PREFIXES))
+        return self
+
+    def split(self, prompt: str):
+        index = prompt.rfind(PROMPT_HEADER)
+        if index < 0:
+            return None
+        prefix = prompt[:index + len(PROMPT_HEADER)]
+        return (prefix, prompt[len(prefix):]) if prefix in self.entries else None
+
+    def encode(self, prompts: List[str]) -> Optional[dict]:
+        """
+        모든 프롬프트가 컴파일된 prefix로 시작하면 tokenizer(prompts, padding_side="left")와 같은 입력을 반환, 아니면 None
+        """
+        parts = [self.split(prompt) for prompt in prompts]
+        if not parts or any(part is None for part in parts):
+            return None
+
+        suffix_ids = self.tokenizer([suffix for _, suffix in parts], add_special_tokens=False)["input_ids"]
+        rows = [self.entries[prefix] + ids for (prefix, _), ids in zip(parts, suffix_ids)]
+        length = max(len(row) for row in rows)
+        return {
+            "input_ids": torch.tensor([[self.pad_token_id] * (length - len(row)) + row for row in rows]),
+            "attention_mask": torch.tensor([[0] * (length - len(row)) + [1] * len(row) for row in rows])
+        }
\ No newline at end of file
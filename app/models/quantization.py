@@ -0,0 +1,81 @@
+import os
+import logging
+import torch
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+"""
+MODEL_PRECISION (PyTorch 백엔드)
+- fp32 : float32 (기본값)
+- bf16 : bfloat16 가중치 및 연산
+- int8-dynamic : Linear 레이어 동적 int8 양자화 (torch.ao.quantization.quantize_dynamic)
+"""
+PRECISIONS = ("fp32", "bf16", "int8-dynamic")
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "fp32")
+PRECISION_SELF_CHECK = os.getenv("PRECISION_SELF_CHECK", "true").lower() == "true"
+
+# 임베딩과 가중치를 공유하는 lm_head는 양자화하면 오히려 별도 사본이 생기므로 제외
+EXCLUDED_MODULES = ("lm_head",)
+
+def quantizable_linear_names(model):
+    return {
+        name for name, module in model.named_modules()
+        if isinstance(module, torch.nn.Linear) and name not in EXCLUDED_MODULES
+    }
+
+def quantize_dynamic_int8(model):
+    return torch.ao.quantization.quantize_dynamic(
+        model,
+        qconfig_spec=quantizable_linear_names(model),
+        dtype=torch.qint8,
+        inplace=True
+    )
+
+def apply_precision(model, precision: str):
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown model precision: {precision} (available: {', '.join(PRECISIONS)})")
+
+    if precision == "bf16":
+        model = model.to(torch.bfloat16)
+    elif precision == "int8-dynamic":
+        model = quantize_dynamic_int8(model)
+
+    model.eval()
+    return model
+
+def generate_mock_recommendations(tokenizer, model):
+    from app.models.engine import InferenceEngine
+    from app.models.inference import generate_recommendations
+    from app.models.model_test import MOCK_DATA
+
+    engine = InferenceEngine(tokenizer, model)
+    return [generate_recommendations(data, engine) for data in MOCK_DATA]
+
+def convert_with_self_check(tokenizer, model, precision: str):
+    """
+    float32 모델을 precision으로 변환하고 model_test의 MOCK_DATA로 결과 비교
+    - 변환 전(fp32) 결과를 먼저 생성한 뒤 같은 모델을 제자리 변환하여 메모리 사용량을 2배로 늘리지 않음
+    - 결과가 하나라도 다르면 (None, mismatches) 반환 -> 호출 측에서 fp32로 다시 로드
+    """
+    expected = generate_mock_recommendations(tokenizer, model)
+    model = apply_precision(model, precision)
+    actual = generate_mock_recommendations(tokenizer, model)
+
+    mismatches = [
+        (index, insight_index, expected_text, actual_text)
+        for index, (expected_list, actual_list) in enumerate(zip(expected, actual))
+        for insight_index, (expected_text, actual_text) in enumerate(zip(expected_list, actual_list))
+        if expected_text != actual_text
+    ]
+    for index, insight_index, expected_text, actual_text in mismatches:
+        logger.warning(
+            "Precision %s changed mock %s insight %s: fp32=%r, %s=%r",
+            precision, index, insight_index + 1, expected_text, precision, actual_text
+        )
+
+    if mismatches:
+        return None, mismatches
+
+    logger.info("Precision self-check passed for %s", precision)
+    return model, []
@@ -0,0 +1,99 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+from app.database.connection import SessionLocal
+from app.database.crud import get_insight_cache, save_insight_cache
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+MODEL_VERSION = os.getenv("MODEL_VERSION", "puricat-report")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))
+
+class ResultCache:
+    """
+    인사이트 결과 2단계 캐시
+    - 1단계 : 메모리 LRU (크기 + TTL 기준 제거)
+    - 2단계 : SQLite insight_cache 테이블 (프로세스 재시작 및 워커 간 공유)
+    - 키 : (model_version, case, insight_number, input_string)
+    """
+    def __init__(self, model_version: str = MODEL_VERSION, max_size: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL, session_factory=SessionLocal):
+        self.model_version = model_version
+        self.max_size = max_size
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def get(self, case: str, insight_number: int, input_string: str) -> Optional[str]:
+        key = (case, insight_number, input_string)
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now - entry[1] <= self.ttl:
+                self.entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+            if entry:
+                del self.entries[key]
+
+        result = self._get_persistent(case, insight_number, input_string)
+
+        with self.lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.persistent_hits += 1
+            self._put_memory(key, result, now)
+        return result
+
+    def put(self, case: str, insight_number: int, input_string: str, result: str):
+        with self.lock:
+            self._put_memory((case, insight_number, input_string), result, time.monotonic())
+
+        db = self.session_factory()
+        try:
+            save_insight_cache(db, self.model_version, case, insight_number, input_string, result)
+        except Exception as e:
+            logger.error(f"Failed to persist insight cache entry: {e}")
+        finally:
+            db.close()
+
+    def stats(self):
+        with self.lock:
+            hits = self.memory_hits + self.persistent_hits
+            total = hits + self.misses
+            return {
+                "modelVersion": self.model_version,
+                "size": len(self.entries),
+                "maxSize": self.max_size,
+                "memoryHits": self.memory_hits,
+                "persistentHits": self.persistent_hits,
+                "misses": self.misses,
+                "hitRate": round(hits / total, 4) if total else 0.0
+            }
+
+    def _put_memory(self, key: tuple, result: str, now: float):
+        self.entries[key] = (result, now)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def _get_persistent(self, case: str, insight_number: int, input_string: str) -> Optional[str]:
+        db = self.session_factory()
+        try:
+            cached = get_insight_cache(db, self.model_version, case, insight_number, input_string)
+            return cached.result if cached else None
+        except Exception as e:
+            logger.error(f"Failed to read insight cache entry: {e}")
+            return None
+        finally:
+            db.close()
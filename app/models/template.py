@@ -0,0 +1,97 @@
+import logging
+from typing import Any, Dict, List
+from app.models.inference import check_data_validity
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+SIMILAR_THRESHOLD = 0.05
+
+def josa_ro(number: int) -> str:
+    """
+    숫자를 읽었을 때의 받침에 맞는 조사
+    - 0(영), 3(삼), 6(육), 10(십), 100(백) ... : 으로
+    - 그 외 (ㄹ 받침 포함) : 로
+    """
+    return "으로" if abs(number) % 10 in (0, 3, 6) else "로"
+
+def compare(value: int, reference: int) -> int:
+    """
+    reference 대비 5% 미만 차이면 0, 크면 1, 작으면 -1
+    """
+    if reference == 0:
+        return 0 if value == 0 else 1
+    ratio = (value - reference) / reference
+    if abs(ratio) < SIMILAR_THRESHOLD:
+        return 0
+    return 1 if ratio > 0 else -1
+
+def change_string(this_week: int, last_week: int, last_week_label: str) -> str:
+    direction = compare(this_week, last_week)
+    verb = "증가했습니다" if direction > 0 else "감소했습니다"
+    if last_week == 0:
+        return f"{last_week_label} 대비 {verb}"
+    percent = int(round(abs(this_week - last_week) / last_week * 100, 0))
+    return f"{last_week_label} 대비 {percent}% {verb}"
+
+def render_insight(case: str, insight_number: int, data: Dict[str, Any]) -> str:
+    """
+    generate_prefix_string / generate_examples의 형식을 그대로 따르는 규칙 기반 인사이트 문장
+    - 띄어쓰기와 마침표도 case별 few-shot 예시 출력과 같게 맞춤 (two_week는 '공기정화시간' / '공기정화량', 마침표 없음)
+    - 입력 값은 generate_input_string과 동일하게 계산 (반올림한 정수)
+    """
+    try:
+        pm_current = int(round(data['pm_current'], 0))
+        pm_this_week = int(round(data['pm_this_week'], 0))
+        this_week_clean_time = int(round(sum(data['averageCleanTime'][1]), 0))
+        this_week_clean_amount = int(round(sum(data['averageCleanAmount'][1]), 0))
+
+        if insight_number == 1:
+            direction = compare(pm_current, pm_this_week)
+            if direction == 0:
+                return f"현재 미세먼지 농도가 {pm_current}{josa_ro(pm_current)} 이번주 평균 미세먼지 농도와 비슷합니다."
+            word = "높습니다" if direction > 0 else "낮습니다"
+            return f"현재 미세먼지 농도가 {pm_current}{josa_ro(pm_current)} 이번주 평균 미세먼지 농도보다 {word}."
+
+        if case == "one_week":
+            if insight_number == 2:
+                return f"이번주 평균 미세먼지 농도는 {pm_this_week}입니다."
+            elif insight_number == 3:
+                return f"이번주 총 공기 정화 시간은 {this_week_clean_time}시간입니다."
+            elif insight_number == 4:
+                return f"이번주 총 공기 정화량은 {this_week_clean_amount}입니다."
+
+        elif case == "two_week":
+            if insight_number == 2:
+                last_week_pm_values = [float(value) for value in data['averagePm'][0] if isinstance(value, (int, float))]
+                last_week_pm = int(round(sum(last_week_pm_values) / len(last_week_pm_values), 0)) if last_week_pm_values else 0
+                head = f"이번주 평균 미세먼지 농도는 {pm_this_week}{josa_ro(pm_this_week)}"
+                if compare(pm_this_week, last_week_pm) == 0:
+                    return f"{head} 저번주 미세먼지 농도와 비슷합니다"
+                return f"{head} " + change_string(pm_this_week, last_week_pm, f"저번주 미세먼지 농도 {last_week_pm}")
+            elif insight_number == 3:
+                last_week_clean_time = int(round(sum(data['averageCleanTime'][0]), 0))
+                head = f"이번주 총 공기정화시간은 {this_week_clean_time}시간으로"
+                if compare(this_week_clean_time, last_week_clean_time) == 0:
+                    return f"{head} 저번주 총 공기정화시간과 비슷합니다"
+                return f"{head} " + change_string(this_week_clean_time, last_week_clean_time, f"저번주 총 공기정화시간 {last_week_clean_time}시간")
+            elif insight_number == 4:
+                last_week_clean_amount = int(round(sum(data['averageCleanAmount'][0]), 0))
+                head = f"이번주 총 공기정화량은 {this_week_clean_amount}{josa_ro(this_week_clean_amount)}"
+                if compare(this_week_clean_amount, last_week_clean_amount) == 0:
+                    return f"{head} 저번주 총 공기정화량과 비슷합니다"
+                return f"{head} " + change_string(this_week_clean_amount, last_week_clean_amount, f"저번주 총 공기정화량 {last_week_clean_amount}")
+    except KeyError as e:
+        logger.error(f"Missing key in data dictionary: {e}")
+    except TypeError as e:
+        logger.error(f"Data type error: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error in render_insight: {e}")
+    return "인사이트를 생성할 수 없습니다."
+
+def render_recommendations(data: Dict[str, Any]) -> List[str]:
+    case = check_data_validity(data)
+    if case == "no_data":
+        return ["아직 데이터가 충분하지 않습니다..."] * 4
+
+    return [render_insight(case, insight_number, data) for insight_number in range(1, 5)]
@@ -0,0 +1,30 @@
+import logging
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, Response
+from app.services.metrics import registry
+
+"""
+Kubernetes probe
+- /healthz : 프로세스가 요청을 처리할 수 있는지 (liveness)
+- /readyz : AI 모델 로드까지 끝났는지 (readiness), 로드 중이면 503
+- /metrics : Prometheus 텍스트 형식 메트릭 (워커 프로세스별 값)
+"""
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(request: Request):
+    startup_report = request.app.state.startup_report
+    body = {"status": "ready" if startup_report.ready else startup_report.model_status, **startup_report.to_dict()}
+    return JSONResponse(status_code=200 if startup_report.ready else 503, content=body)
+
+@router.get("/metrics")
+async def read_metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
\ No newline at end of file
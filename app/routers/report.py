@@ -1,11 +1,18 @@
+import json
 import logging
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, Path, HTTPException, Request
-from sqlalchemy.orm import Session
-from app.database.connection import get_db
-from app.services.preprocess import process_daily_post, process_hourly_post
-from app.services.json_load import load_device_json
-from app.services.recommendation import generate_and_update_recommendation
+from fastapi import APIRouter, Body, Depends, Path, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import get_async_db
+from app.services.preprocess import (
+    process_daily_post, process_daily_delta_post, process_daily_bulk_post,
+    process_hourly_post, process_hourly_bulk_post
+)
+from app.database.crud import get_report_version
+from app.services.json_load import load_device_json_bytes
+from app.services.report_cache import make_etag, report_cache
+from app.services.job_queue import QueueFullError, ModelLoadingError
 
 """
 Swagger UI
@@ -21,6 +28,59 @@ logging.basicConfig(level=logging.INFO)
 
 router = APIRouter()
 
+def queue_full_exception(error: QueueFullError):
+    """
+    대기열이 가득 찬 경우 503 + Retry-After (수신한 데이터도 추천 작업과 함께 rollback되므로 같은 요청을 다시 보내면 됨)
+    """
+    logger.warning("Recommendation queue is full; asking client to retry after %ss", error.retry_after)
+    return HTTPException(
+        status_code=503,
+        detail="추천 생성 대기열이 가득 찼습니다. 잠시 후 다시 시도해 주세요.",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def model_loading_exception(error: ModelLoadingError):
+    """
+    모델 로드 중에는 SSE 스트림을 시작하지 않고 503 + Retry-After
+    """
+    logger.warning("Inference engine is still loading; asking client to retry after %ss", error.retry_after)
+    return HTTPException(
+        status_code=503,
+        detail="AI 모델을 불러오는 중입니다. 잠시 후 다시 시도해 주세요.",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def bulk_response(queue, device_ids, jobs):
+    """
+    bulk 요청은 대기열에 자리가 있는 만큼만 추천 생성 작업을 등록
+    - jobs : 등록된 작업, rejected : 데이터는 저장했지만 작업을 등록하지 못한 기기 (retryAfter초 후 해당 기기만 다시 전송)
+    """
+    rejected = [device_id for device_id, job in zip(device_ids, jobs) if job is None]
+    response = {
+        **create_response(202, "요청이 접수되었습니다. 추천 생성은 백그라운드에서 진행됩니다."),
+        "jobs": [{"deviceId": job.device_id, "jobId": job.job_id} for job in jobs if job is not None],
+        "rejected": rejected
+    }
+    if rejected:
+        response["message"] = "데이터는 저장되었지만 대기열이 가득 차 일부 기기의 추천 생성이 접수되지 않았습니다. rejected 기기는 잠시 후 다시 전송해 주세요."
+        response["retryAfter"] = queue.retry_after()
+    return response
+
+class ReservedStreamingResponse(StreamingResponse):
+    """
+    응답이 끝나면 admit_stream의 대기열 예약 해제
+    - 응답을 시작하기 전에 연결이 끊겨 본문 generator가 한 번도 실행되지 않은 경우에도 예약이 남지 않음
+    """
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
 def create_response(status: int, message: str):
     return {
         "status": status,
@@ -30,59 +90,236 @@ def create_response(status: int, message: str):
 
 @router.get("/")
 async def read_root():
-    print("hello")
     return {"message": "hello"}
 
-@router.post("/devices/{deviceId}/report/daily")
+@router.post("/devices/{deviceId}/report/daily", status_code=202)
 async def post_daily_report(
     request: Request,
     deviceId: int = Path(..., title="Device ID", description="기기 ID"),
     data: dict = {},
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info("Received DAILY POST request for device_id: %s", deviceId)
     try:
-        process_daily_post(db, data, deviceId)
+        await db.run_sync(process_daily_post, data, deviceId, commit=False)
 
-        generate_and_update_recommendation(db, deviceId, request)
+        job = await request.app.state.recommendation_queue.enqueue(db, deviceId)
 
-        return create_response(201, "리소스가 성공적으로 생성되었습니다.")
+        return {**create_response(202, "요청이 접수되었습니다. 추천 생성은 백그라운드에서 진행됩니다."), "jobId": job.job_id}
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     except Exception as e:
         logger.error("Error processing DAILY POST for device_id %s: %s", deviceId, str(e))
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
     
-@router.post("/devices/{deviceId}/report/hourly")
+@router.post("/devices/{deviceId}/report/daily/delta", status_code=202)
+async def post_daily_delta_report(
+    request: Request,
+    deviceId: int = Path(..., title="Device ID", description="기기 ID"),
+    data: dict = {},
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    DAILY 증분 업로드 : 전체 2주치 대신 새로 쌓인 하루치 SensorArchive / CleanLog만 전송
+    """
+    logger.info("Received DAILY DELTA POST request for device_id: %s", deviceId)
+    try:
+        await db.run_sync(process_daily_delta_post, data, deviceId, commit=False)
+
+        job = await request.app.state.recommendation_queue.enqueue(db, deviceId)
+
+        return {**create_response(202, "요청이 접수되었습니다. 추천 생성은 백그라운드에서 진행됩니다."), "jobId": job.job_id}
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+    except Exception as e:
+        logger.error("Error processing DAILY DELTA POST for device_id %s: %s", deviceId, str(e))
+        raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
+
+@router.post("/devices/{deviceId}/report/hourly", status_code=202)
 async def post_hourly_report(
     request: Request,
     deviceId: int = Path(..., title="Device ID", description="기기 ID"),
     data: dict = {},
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info("Received HOURLY POST request for device_id: %s", deviceId)
     try:
-        process_hourly_post(db, data, deviceId)
+        await db.run_sync(process_hourly_post, data, deviceId, commit=False)
 
-        generate_and_update_recommendation(db, deviceId, request)
+        job = await request.app.state.recommendation_queue.enqueue(db, deviceId)
 
-        return create_response(201, "리소스가 성공적으로 생성되었습니다.")
+        return {**create_response(202, "요청이 접수되었습니다. 추천 생성은 백그라운드에서 진행됩니다."), "jobId": job.job_id}
+    except QueueFullError as e:
+        raise queue_full_exception(e)
     except Exception as e:
         logger.error("Error processing HOURLY POST for device_id %s: %s", deviceId, str(e))
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
     
+@router.post("/devices/report/daily/bulk", status_code=202)
+async def post_daily_bulk_report(
+    request: Request,
+    data: list = Body(default=[]),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    여러 기기의 DAILY 데이터를 한 번에 전송 : [{"deviceId", "pmCurrent", "SensorArchive", "CleanLog"}, ...]
+    """
+    logger.info("Received DAILY BULK POST request for %s device(s)", len(data))
+    try:
+        device_ids = await db.run_sync(process_daily_bulk_post, data, commit=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error processing DAILY BULK POST: %s", str(e))
+        raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
+
+    try:
+        jobs = await request.app.state.recommendation_queue.enqueue_many(db, device_ids)
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+
+    return bulk_response(request.app.state.recommendation_queue, device_ids, jobs)
+
+@router.post("/devices/report/hourly/bulk", status_code=202)
+async def post_hourly_bulk_report(
+    request: Request,
+    data: list = Body(default=[]),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    여러 기기의 HOURLY 데이터를 한 번에 전송 : [{"deviceId", "pmCurrent"}, ...]
+    """
+    logger.info("Received HOURLY BULK POST request for %s device(s)", len(data))
+    try:
+        device_ids = await db.run_sync(process_hourly_bulk_post, data, commit=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error processing HOURLY BULK POST: %s", str(e))
+        raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
+
+    try:
+        jobs = await request.app.state.recommendation_queue.enqueue_many(db, device_ids)
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+
+    return bulk_response(request.app.state.recommendation_queue, device_ids, jobs)
+
 @router.get("/devices/{deviceId}/report/weekly")
 async def get_weekly_report(
+    request: Request,
     deviceId: int = Path(..., title="Device ID", description="기기 ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """
+    report_version 기반 ETag
+    - If-None-Match가 현재 버전과 같으면 304 (본문 없음)
+    - 같은 버전의 응답은 직렬화된 상태로 캐시하여 재사용
+    """
     logger.info("Received GET request for WEEKLY report for device_id: %s", deviceId)
-    
-    result = load_device_json(db, deviceId)
-    
-    if not result:
+
+    version = await db.run_sync(get_report_version, deviceId)
+    if version is None:
+        return {
+            "status": "DEVICE_NOT_FOUND",
+            "message": "기기를 찾을 수 없습니다.",
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+    etag = make_etag(deviceId, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    loaded = await db.run_sync(load_device_json_bytes, deviceId, version)
+    if loaded is None:
         return {
             "status": "DEVICE_NOT_FOUND",
             "message": "기기를 찾을 수 없습니다.",
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
 
-    return result
\ No newline at end of file
+    version, body = loaded
+    headers["ETag"] = make_etag(deviceId, version)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/devices/{deviceId}/report/stream")
+async def stream_report(
+    request: Request,
+    deviceId: int = Path(..., title="Device ID", description="기기 ID")
+):
+    """
+    Server-Sent Events
+    - event: token   data: {"insightNumber", "text"}
+    - event: insight data: {"insightNumber", "recommendation"}
+    - event: done    data: {"deviceId", "recommendations"}
+    """
+    logger.info("Received STREAM request for device_id: %s", deviceId)
+
+    queue = request.app.state.recommendation_queue
+    try:
+        release = await queue.admit_stream()
+    except ModelLoadingError as e:
+        raise model_loading_exception(e)
+    except QueueFullError as e:
+        raise queue_full_exception(e)
+
+    async def event_stream():
+        async for event, payload in queue.stream(deviceId, release):
+            yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    return ReservedStreamingResponse(
+        event_stream(),
+        release,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs/{jobId}")
+async def get_job_status(
+    request: Request,
+    jobId: str = Path(..., title="Job ID", description="추천 생성 작업 ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    logger.info("Received GET request for recommendation job: %s", jobId)
+
+    job = await request.app.state.recommendation_queue.get_job(db, jobId)
+
+    if not job:
+        return {
+            "status": "JOB_NOT_FOUND",
+            "message": "작업을 찾을 수 없습니다.",
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+    return job.to_dict()
+
+@router.get("/inference/queue")
+async def get_inference_queue_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    추론 대기열 상태 : 워커 수, 실행 중 / 대기 중 작업 수, 거절 수, 대기 시간
+    """
+    logger.info("Received GET request for inference queue stats")
+
+    queue = request.app.state.recommendation_queue
+    await queue.refresh_depth(db)
+    return queue.stats()
+
+@router.get("/reports/cache")
+async def get_report_cache_stats():
+    logger.info("Received GET request for report cache stats")
+    return report_cache.stats()
+
+@router.get("/inference/cache")
+async def get_inference_cache_stats(request: Request):
+    logger.info("Received GET request for inference cache stats")
+
+    engine = getattr(request.app.state, "engine", None)
+    if engine is None:
+        return {
+            "status": "MODEL_NOT_LOADED",
+            "message": "AI 모델이 로드되지 않았습니다.",
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+
+    return engine.result_cache.stats()
\ No newline at end of file
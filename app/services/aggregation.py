@@ -0,0 +1,37 @@
+import logging
+from datetime import timedelta
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+PM_SUM, PM_COUNT, CLEAN_TIME, CLEAN_AMOUNT, CLEAN_COUNT, EARLIEST_CREATED_AT = range(6)
+
+def build_week_arrays(buckets, ref_date) -> Dict[str, List[List]]:
+    """
+    날짜별 합계를 요일 인덱스(월=0 ~ 일=6)의 [저번주, 이번주] 배열로 변환
+    - ref_date - 6일 이후 : 이번주, 그 이전 : 저번주 (날짜 오름차순으로 채워 최근 날짜가 우선)
+    - 미세먼지 : 날짜별 평균 (소수점 1자리), 정화 시간 / 정화량 : 날짜별 합계 (정수 반올림)
+    """
+    average_pm = [[0] * 7, [0] * 7]
+    average_clean_time = [[0] * 7, [0] * 7]
+    average_clean_amount = [[0] * 7, [0] * 7]
+
+    if ref_date is not None:
+        this_week_start = ref_date - timedelta(days=6)
+        for date in sorted(buckets):
+            bucket = buckets[date]
+            week = 1 if date >= this_week_start else 0
+            weekday = date.weekday()
+
+            if bucket[PM_COUNT]:
+                average_pm[week][weekday] = round(bucket[PM_SUM] / bucket[PM_COUNT] * 10) / 10
+            if bucket[CLEAN_COUNT]:
+                average_clean_time[week][weekday] = int(round(bucket[CLEAN_TIME]))
+                average_clean_amount[week][weekday] = int(round(bucket[CLEAN_AMOUNT]))
+
+    return {
+        "averagePm": average_pm,
+        "averageCleanTime": average_clean_time,
+        "averageCleanAmount": average_clean_amount
+    }
@@ -0,0 +1,298 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import SessionLocal, AsyncSessionLocal
+from app.database.crud import (
+    enqueue_recommendation_jobs, claim_recommendation_job, finish_recommendation_job, get_recommendation_job,
+    count_queued_recommendation_jobs, has_queued_recommendation_job, delete_finished_recommendation_jobs
+)
+from app.services.recommendation import generate_and_update_recommendation, stream_and_update_recommendation
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", "1"))
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "1000"))
+MAX_QUEUE_DEPTH = int(os.getenv("MAX_QUEUE_DEPTH", "100"))
+MODEL_LOADING_RETRY_AFTER = int(os.getenv("MODEL_LOADING_RETRY_AFTER", "10"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_PRUNE_INTERVAL_SECONDS = 60
+TIMING_SAMPLES = 200
+
+class QueueFullError(Exception):
+    """
+    대기열이 가득 차 요청을 받을 수 없음
+    - retry_after : 다시 시도할 때까지 기다릴 예상 시간(초)
+    """
+    def __init__(self, retry_after: int):
+        super().__init__(f"Recommendation queue is full (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+class ModelLoadingError(Exception):
+    """
+    모델 로드가 끝나지 않아 SSE 스트림을 시작할 수 없음
+    - retry_after : 다시 시도할 때까지 기다릴 시간(초)
+    """
+    def __init__(self, retry_after: int = MODEL_LOADING_RETRY_AFTER):
+        super().__init__(f"Inference engine is still loading (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+class RecommendationQueue:
+    """
+    추천 생성 작업 큐
+    - POST 요청은 작업 등록 후 바로 응답하고, 워커가 백그라운드에서 추론 및 update_recommendation 수행
+    - 작업 상태는 recommendation_job 테이블에 저장하므로 멀티 워커(gunicorn)에서도 어느 프로세스에서나 /jobs/{jobId} 조회 가능
+    - 같은 기기의 작업이 이미 대기 중이면(다른 프로세스가 등록한 작업 포함) 새 작업을 만들지 않고 기존 작업에 합침
+    - 워커는 가장 오래된 대기 작업을 가져가며, 같은 프로세스의 등록은 바로, 다른 프로세스의 등록은 JOB_POLL_SECONDS마다 확인
+    - 추론은 이벤트 루프가 아닌 전용 스레드 풀(workers개)에서 실행하고, 작업과 SSE 스트림이 같은 슬롯을 나눠 씀
+    - 대기 중인 작업(전체 프로세스) + 이 프로세스의 스트림이 max_depth에 도달하면 새 작업은 등록하지 않음
+      (bulk 요청은 자리가 있는 만큼만 등록, 하나도 등록하지 못하면 QueueFullError)
+    - ready : 설정하면 이 이벤트가 set될 때까지(모델 로드 완료) 작업을 가져가지 않음
+    - 워커 프로세스가 강제 종료되면 그 프로세스가 실행 중이던 작업은 running으로 남음
+    """
+    def __init__(self, get_engine: Callable, workers: int = RECOMMENDATION_WORKERS, max_depth: int = MAX_QUEUE_DEPTH, ready: Optional[asyncio.Event] = None):
+        self.get_engine = get_engine
+        self.ready = ready
+        self.workers = workers
+        self.max_depth = max_depth
+        self.queued = 0
+        self.wakeup: Optional[asyncio.Event] = None
+        self.tasks = []
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.waiting_streams = 0
+        self.running = 0
+        self.rejected = 0
+        self.pruned_at = 0.0
+        self.wait_times = deque(maxlen=TIMING_SAMPLES)
+        self.run_times = deque(maxlen=TIMING_SAMPLES)
+
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self.slots = asyncio.Semaphore(self.workers)
+        self.tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info("Recommendation queue started with %s worker(s), max depth %s", self.workers, self.max_depth)
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Recommendation queue stopped")
+
+    async def enqueue(self, db: AsyncSession, device_id: int):
+        return (await self.enqueue_many(db, [device_id]))[0]
+
+    async def enqueue_many(self, db: AsyncSession, device_ids) -> list:
+        """
+        여러 기기의 작업을 한 번에 등록 (device_ids 순서대로 작업 목록 반환, 자리가 없어 등록하지 못한 기기는 None)
+        - 요청 세션에 저장 중인 데이터와 작업을 한 번에 commit
+        - 한 작업도 등록하지 못했으면 데이터까지 rollback하고 QueueFullError
+        """
+        jobs = await db.run_sync(enqueue_recommendation_jobs, device_ids, self.max_depth, self.waiting_streams, commit=False)
+        if None in jobs:
+            self.reject()
+        if jobs and all(job is None for job in jobs):
+            await db.rollback()
+            await self.refresh_depth(db)
+            raise QueueFullError(self.retry_after())
+
+        await db.commit()
+        self.wakeup.set()
+        await self.refresh_depth(db)
+        return jobs
+
+    async def get_job(self, db: AsyncSession, job_id: str):
+        return await db.run_sync(get_recommendation_job, job_id)
+
+    async def refresh_depth(self, db: Optional[AsyncSession] = None) -> int:
+        """
+        전체 프로세스의 대기 작업 수를 DB에서 다시 읽음 (db가 없으면 짧은 세션을 따로 사용)
+        """
+        if db is not None:
+            self.queued = await db.run_sync(count_queued_recommendation_jobs)
+            return self.queued
+        async with AsyncSessionLocal() as session:
+            self.queued = await session.run_sync(count_queued_recommendation_jobs)
+        return self.queued
+
+    def reject(self):
+        """
+        대기열이 가득 차 요청을 거절했음을 기록 (stats의 rejected, /metrics의 puricat_recommendation_queue_rejected_total)
+        """
+        self.rejected += 1
+        metrics.queue_rejected.inc()
+
+    def depth(self) -> int:
+        """
+        마지막으로 읽은 전체 대기 작업 수
+        - 작업 등록 / 작업 가져가기 / 스트림 허용 / 통계 조회 때마다 refresh_depth로 갱신
+        """
+        return self.queued
+
+    def waiting(self) -> int:
+        return self.depth() + self.waiting_streams
+
+    def retry_after(self) -> int:
+        """
+        최근 평균 실행 시간 기준으로 대기열이 비워질 때까지의 예상 시간(초)
+        """
+        average_run = sum(self.run_times) / len(self.run_times) if self.run_times else 1.0
+        return max(1, math.ceil(average_run * (self.waiting() + 1) / self.workers))
+
+    def stats(self):
+        waits = sorted(self.wait_times)
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "depth": self.depth(),
+            "waitingStreams": self.waiting_streams,
+            "maxDepth": self.max_depth,
+            "rejected": self.rejected,
+            "waitSeconds": {
+                "avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                "max": round(waits[-1], 3) if waits else 0.0
+            },
+            "runSeconds": {
+                "avg": round(sum(self.run_times) / len(self.run_times), 3) if self.run_times else 0.0
+            }
+        }
+
+    async def admit_stream(self) -> Callable:
+        """
+        SSE 스트림도 작업과 같은 슬롯을 사용하므로 응답을 시작하기 전에 대기열 자리를 확인하고 예약 (대기 작업 수는 DB에서 다시 읽음)
+        - 모델 로드 중(ready가 set되기 전)이면 ModelLoadingError
+        - 확인과 waiting_streams 증가 사이에 await가 없으므로 동시에 들어온 요청도 max_depth를 넘지 않음
+        - 반환 : 예약 해제 함수 (여러 번 호출해도 한 번만 해제, stream이 슬롯을 잡거나 응답이 끝나면 호출)
+        """
+        if self.ready is not None and not self.ready.is_set():
+            raise ModelLoadingError()
+        await self.refresh_depth()
+        if self.waiting() >= self.max_depth:
+            self.reject()
+            raise QueueFullError(self.retry_after())
+
+        self.waiting_streams += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.waiting_streams -= 1
+
+        return release
+
+    async def stream(self, device_id: int, release: Callable):
+        """
+        admit_stream 이후 호출 : 추론 스레드에서 (event, payload)를 생성하고 이벤트 루프에서 전달
+        - release : admit_stream이 반환한 예약 해제 함수 (슬롯을 잡거나 대기 중 연결이 끊기면 호출)
+        """
+        queued_at = time.monotonic()
+        try:
+            await self.slots.acquire()
+        finally:
+            release()
+        self.wait_times.append(time.monotonic() - queued_at)
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def produce():
+            try:
+                for item in stream_and_update_recommendation(device_id, self.get_engine()):
+                    loop.call_soon_threadsafe(events.put_nowait, item)
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        self.running += 1
+        started_at = time.monotonic()
+        future = loop.run_in_executor(self.executor, produce)
+        future.add_done_callback(lambda _: self._release(started_at))
+
+        while True:
+            item = await events.get()
+            if item is None:
+                break
+            yield item
+
+    async def _worker(self, worker_id: int):
+        if self.ready is not None:
+            await self.ready.wait()
+
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.slots.acquire()
+            try:
+                job = await loop.run_in_executor(self.executor, self._claim)
+            except Exception as e:
+                logger.error("Failed to claim recommendation job: %s", str(e))
+                job = None
+
+            if job is None:
+                self.slots.release()
+                await self._wait_for_jobs()
+                continue
+
+            self.wait_times.append((job.started_at - job.created_at).total_seconds())
+            self.running += 1
+            started_at = time.monotonic()
+            try:
+                await loop.run_in_executor(self.executor, self._run, job.job_id, job.device_id)
+            except Exception as e:
+                logger.error("Failed to record recommendation job %s: %s", job.job_id, str(e))
+            finally:
+                self._release(started_at)
+
+    async def _wait_for_jobs(self):
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self.wakeup.clear()
+
+    def _release(self, started_at: float):
+        self.run_times.append(time.monotonic() - started_at)
+        self.running -= 1
+        self.slots.release()
+
+    def _claim(self):
+        db = SessionLocal()
+        try:
+            job = claim_recommendation_job(db)
+            if job:
+                db.expunge(job)
+            self.queued = count_queued_recommendation_jobs(db)
+            if job is None and time.monotonic() - self.pruned_at > JOB_PRUNE_INTERVAL_SECONDS:
+                self.pruned_at = time.monotonic()
+                delete_finished_recommendation_jobs(db, MAX_FINISHED_JOBS)
+            return job
+        finally:
+            db.close()
+
+    def _run(self, job_id: str, device_id: int):
+        db = SessionLocal()
+        try:
+            try:
+                generate_and_update_recommendation(
+                    db, device_id, self.get_engine(),
+                    superseded=lambda: has_queued_recommendation_job(db, device_id)
+                )
+            except Exception as e:
+                logger.error("Recommendation job %s failed for device_id %s: %s", job_id, device_id, str(e))
+                finish_recommendation_job(db, job_id, "failed", str(e))
+                return
+            finish_recommendation_job(db, job_id, "done")
+        finally:
+            db.close()
\ No newline at end of file
@@ -1,31 +1,57 @@
 import json
 import logging
 from sqlalchemy.orm import Session
-from app.database.crud import get_device, get_hourly_data, get_daily_data, get_recommendation
+from app.database.crud import get_device_report
+from app.services.report_cache import report_cache
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 def load_device_json(db: Session, device_id: int):
     logger.info("Loading JSON data for device_id: %s", device_id)
-    device = get_device(db, device_id)
+    device = get_device_report(db, device_id)
     if not device:
         logger.warning("Device %s not found", device_id)
         return {}
-    
-    hourly = get_hourly_data(db, device_id)
-    daily = get_daily_data(db, device_id)
-    reco = get_recommendation(db, device_id)
-    
-    result = {
-        "deviceId": device_id,
+
+    result = build_device_json(device)
+
+    logger.debug("Loaded JSON data: %s", result)
+    return result
+
+def load_device_json_bytes(db: Session, device_id: int, version: int):
+    """
+    report_version이 같으면 직렬화해 둔 응답을 그대로 반환하고, 다르면 다시 조회 후 캐시
+    - 반환 : (version, body), 기기가 없으면 None
+    """
+    body = report_cache.get(device_id, version)
+    if body is not None:
+        return version, body
+
+    logger.info("Loading JSON data for device_id: %s (report version %s)", device_id, version)
+    device = get_device_report(db, device_id)
+    if not device:
+        logger.warning("Device %s not found", device_id)
+        return None
+
+    body = json.dumps(build_device_json(device), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    report_cache.put(device_id, device.report_version, body)
+    return device.report_version, body
+
+def build_device_json(device):
+    """
+    get_device_report로 한 번에 조회한 기기 데이터를 응답 형태로 변환
+    """
+    hourly = device.hourly_data
+    daily = device.daily_data
+    reco = device.recommendation
+
+    return {
+        "deviceId": device.device_id,
         "timestamp": hourly.timestamp.isoformat() if hourly and hourly.timestamp else None,
         "period": hourly.period if hourly and hourly.period else None,
         "averagePm": json.loads(daily.average_pm) if daily and daily.average_pm else [],
         "averageCleanTime": json.loads(daily.average_clean_time) if daily and daily.average_clean_time else [],
         "averageCleanAmount": json.loads(daily.average_clean_amount) if daily and daily.average_clean_amount else [],
-        "recommendations": json.loads(reco.recommendations) if reco and reco.recommendations else []
-    }
-    
-    logger.info("Loaded JSON data: %s", result)
-    return result
\ No newline at end of file
+        "recommendations": reco.get_texts() if reco else []
+    }
\ No newline at end of file
@@ -0,0 +1,222 @@
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+"""
+Prometheus 텍스트 형식(/metrics) 메트릭
+- Histogram / Counter / Gauge 세 가지만 지원하고, 모든 값은 프로세스 메모리에 보관 (워커별로 수집)
+- stage_timer / timed : 파이프라인 단계별 소요 시간, db_timed : crud 함수별 DB 호출 시간
+"""
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+
+    def key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+    def samples(self):
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        super().__init__(name, description, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+
+class Gauge(Metric):
+    """
+    값을 직접 set하거나, callback을 등록하여 /metrics 조회 시점의 값을 읽음
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        super().__init__(name, description, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+    def set_function(self, callback: Callable[[], float], **labels):
+        with self.lock:
+            self.callbacks[self.key(labels)] = callback
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+            callbacks = dict(self.callbacks)
+        for key, callback in callbacks.items():
+            try:
+                values[key] = callback()
+            except Exception as e:
+                logger.warning("Gauge %s callback failed: %s", self.name, str(e))
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def samples(self):
+        with self.lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self.series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = format_labels(self.label_names, key, ("le", format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.label_names, key)} {format_value(total)}"
+            yield f"{self.name}_count{format_labels(self.label_names, key)} {count}"
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_request_seconds = registry.register(Histogram(
+    "puricat_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+))
+stage_seconds = registry.register(Histogram(
+    "puricat_stage_duration_seconds", "Report pipeline stage latency", ("stage",)
+))
+db_seconds = registry.register(Histogram(
+    "puricat_db_duration_seconds", "Database call latency by crud function", ("operation",)
+))
+generated_tokens = registry.register(Counter(
+    "puricat_generated_tokens_total", "Tokens generated by the model"
+))
+decode_tokens_per_second = registry.register(Histogram(
+    "puricat_decode_tokens_per_second", "Decode throughput per generate call (all rows in the batch)", buckets=THROUGHPUT_BUCKETS
+))
+queue_depth = registry.register(Gauge(
+    "puricat_recommendation_queue_depth", "Recommendation jobs and streams waiting for an inference slot"
+))
+queue_running = registry.register(Gauge(
+    "puricat_recommendation_queue_running", "Recommendation jobs and streams currently running"
+))
+queue_rejected = registry.register(Counter(
+    "puricat_recommendation_queue_rejected_total", "Requests rejected because the recommendation queue was full"
+))
+
+@contextmanager
+def stage_timer(stage: str):
+    with stage_seconds.time(stage=stage):
+        yield
+
+def timed(stage: str):
+    """
+    함수 전체 실행 시간을 stage 이름으로 기록하는 데코레이터
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_seconds.time(stage=stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def db_timed(func):
+    """
+    crud 함수의 실행 시간을 함수 이름으로 기록하는 데코레이터
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with db_seconds.time(operation=func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def observe_generation(prefill_seconds: Optional[float], decode_seconds: Optional[float], tokens: int, decode_tokens: int):
+    """
+    generate 호출 한 번의 결과 기록
+    - tokens : 생성된 전체 토큰 수, decode_tokens : prefill에서 나온 첫 토큰을 제외한 토큰 수 (tokens/sec 계산용)
+    """
+    if prefill_seconds is not None:
+        stage_seconds.observe(prefill_seconds, stage="prefill")
+    if decode_seconds is not None:
+        stage_seconds.observe(decode_seconds, stage="decode")
+        if decode_seconds > 0 and decode_tokens:
+            decode_tokens_per_second.observe(decode_tokens / decode_seconds)
+    generated_tokens.inc(tokens)
\ No newline at end of file
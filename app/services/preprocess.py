@@ -1,51 +1,52 @@
 import logging
 from datetime import datetime, timezone, timedelta
-import pandas as pd
 from sqlalchemy.orm import Session
-from app.database.crud import get_device, create_device, update_hourly_data, update_daily_data
+from app.database.crud import (
+    create_devices, upsert_hourly_data, upsert_daily_data,
+    bulk_insert_sensor_readings, bulk_insert_clean_sessions, refresh_daily_aggregates,
+    get_latest_reading_times, get_ingested_keys, get_daily_aggregates, delete_daily_aggregates_before
+)
+from app.services.aggregation import build_week_arrays
+from app.services.metrics import timed
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def process_hourly_post(db: Session, data: dict, device_id: int):
+@timed("process_hourly_post")
+def process_hourly_post(db: Session, data: dict, device_id: int, commit: bool = True):
     logger.info("Processing HOURLY POST data for device_id: %s", device_id)
     try:
-        device = get_device(db, device_id)
-        if not device:
-            create_device(db, device_id)
+        ingest_hourly_batch(db, [(device_id, data)], commit=commit)
 
-        pm_current = data.get("pmCurrent")
-        current_time = datetime.now(timezone.utc)
+    except Exception as e:
+        logger.error("Error processing HOURLY POST data for device_id %s: %s", device_id, str(e))
+        raise e
 
-        update_hourly_data(db, device_id, current_time, pm_current, None)
+@timed("process_hourly_bulk_post")
+def process_hourly_bulk_post(db: Session, items, commit: bool = True):
+    """
+    여러 기기의 HOURLY 데이터를 한 번에 처리 : [{"deviceId", "pmCurrent"}, ...]
+    - 한 트랜잭션으로 저장하고 처리한 device_id 목록을 반환 (commit=False면 호출한 쪽에서 commit)
+    """
+    logger.info("Processing HOURLY BULK POST data for %s device(s)", len(items))
+    try:
+        batch = split_bulk_items(items)
+        ingest_hourly_batch(db, batch, commit=commit)
+        return [device_id for device_id, _ in batch]
 
     except Exception as e:
-        logger.error("Error processing HOURLY POST data for device_id %s: %s", device_id, str(e))
+        logger.error("Error processing HOURLY BULK POST data: %s", str(e))
         raise e
 
-def process_daily_post(db: Session, data: dict, device_id: int):
+@timed("process_daily_post")
+def process_daily_post(db: Session, data: dict, device_id: int, commit: bool = True):
+    """
+    DAILY 전체 업로드 : 기기는 2주치 SensorArchive / CleanLog를 전송
+    - 이미 저장된 행은 무시되므로 같은 데이터를 다시 보내도 결과가 같음
+    """
     logger.info("Processing DAILY POST data for device_id: %s", device_id)
     try:
-        device = get_device(db, device_id)
-        if not device:
-            create_device(db, device_id)
-            
-        pm_current = data.get("pmCurrent")
-        current_time = datetime.now(timezone.utc)
-        clean_logs = data.get("CleanLog", [])
-        sensor_archive = data.get("SensorArchive", [])
-
-        period_str = get_period_str(clean_logs, current_time)
-        update_hourly_data(db, device_id, current_time, pm_current, period_str)
-
-        last_week_clean_time, this_week_clean_time, last_week_clean_amount, this_week_clean_amount = process_clean_log(clean_logs, sensor_archive)
-        last_week_pm, this_week_pm = process_sensor_archive(sensor_archive)
-
-        average_pm = [last_week_pm, this_week_pm]
-        average_clean_time = [last_week_clean_time, this_week_clean_time]
-        average_clean_amount = [last_week_clean_amount, this_week_clean_amount]
-
-        update_daily_data(db, device_id, average_pm, average_clean_time, average_clean_amount)
+        ingest_daily_batch(db, [(device_id, data)], commit=commit)
         logger.info("DAILY POST processing completed for device_id: %s", device_id)
 
     except Exception as e:
@@ -53,74 +54,202 @@ def process_daily_post(db: Session, data: dict, device_id: int):
         db.rollback()
         raise e
 
-def get_period_str(clean_logs, current_time):
+@timed("process_daily_delta_post")
+def process_daily_delta_post(db: Session, data: dict, device_id: int, commit: bool = True):
+    """
+    DAILY 증분 업로드 : 기기는 전날 하루치 SensorArchive / CleanLog만 전송
+    - 주간 배열과 period는 저장된 일별 집계로부터 계산 (전체 2주치 업로드와 같은 결과)
+    """
+    logger.info("Processing DAILY DELTA POST data for device_id: %s", device_id)
+    try:
+        ingest_daily_batch(db, [(device_id, data)], commit=commit)
+        logger.info("DAILY DELTA POST processing completed for device_id: %s", device_id)
+
+    except Exception as e:
+        logger.error("Error processing DAILY DELTA POST data for device_id %s: %s", device_id, str(e))
+        db.rollback()
+        raise e
+
+@timed("process_daily_bulk_post")
+def process_daily_bulk_post(db: Session, items, commit: bool = True):
+    """
+    여러 기기의 DAILY 데이터를 한 번에 처리 : [{"deviceId", "pmCurrent", "SensorArchive", "CleanLog"}, ...]
+    - 전체 업로드 / 증분 업로드 모두 허용, 한 트랜잭션으로 저장하고 처리한 device_id 목록을 반환 (commit=False면 호출한 쪽에서 commit)
+    """
+    logger.info("Processing DAILY BULK POST data for %s device(s)", len(items))
+    try:
+        batch = split_bulk_items(items)
+        ingest_daily_batch(db, batch, commit=commit)
+        logger.info("DAILY BULK POST processing completed for %s device(s)", len(batch))
+        return [device_id for device_id, _ in batch]
+
+    except Exception as e:
+        logger.error("Error processing DAILY BULK POST data: %s", str(e))
+        db.rollback()
+        raise e
+
+def split_bulk_items(items):
+    """
+    [{"deviceId", ...}, ...] -> [(device_id, data), ...]
+    - 같은 기기가 여러 번 오면 마지막 항목만 사용
+    """
+    batch = {}
+    for item in items:
+        if not isinstance(item, dict) or item.get("deviceId") is None:
+            raise ValueError("deviceId가 없는 항목이 있습니다.")
+        batch[int(item["deviceId"])] = item
+    return list(batch.items())
+
+def ingest_hourly_batch(db: Session, batch, commit: bool = True):
+    current_time = datetime.now(timezone.utc)
+
+    create_devices(db, [device_id for device_id, _ in batch], commit=False)
+    upsert_hourly_data(db, [
+        {"device_id": device_id, "timestamp": current_time, "pm_current": data.get("pmCurrent"), "period": None}
+        for device_id, data in batch
+    ], commit=False)
+    if commit:
+        db.commit()
+
+def ingest_daily_batch(db: Session, batch, commit: bool = True):
+    """
+    batch : [(device_id, data), ...] 를 한 트랜잭션으로 처리 (commit=False면 호출한 쪽에서 추천 작업과 함께 commit)
+    1. SensorArchive / CleanLog 중 아직 저장되지 않은 행만 sensor_reading / clean_session에 저장
+       - 14일 범위 안에서 저장된 기본키와 비교하므로 빠진 시간 / 날짜를 나중에 보내도 저장되고, 14일 범위보다 오래된 행은 무시
+    2. 새 행이 들어온 날짜의 daily_aggregate를 원본 테이블에서 SQL로 다시 집계하고 14일 범위를 벗어난 날짜는 삭제
+    3. 주간 배열과 period를 daily_aggregate로부터 계산
+    """
+    current_time = datetime.now(timezone.utc)
+    device_ids = [device_id for device_id, _ in batch]
+
+    create_devices(db, device_ids, commit=False)
+    latest_reading_times = get_latest_reading_times(db, device_ids)
+
+    parsed, ref_dates, window_starts = {}, {}, {}
+    for device_id, data in batch:
+        device_readings = parse_sensor_readings(data.get("SensorArchive", []), device_id)
+        device_sessions = parse_clean_sessions(data.get("CleanLog", []), device_id)
+        parsed[device_id] = (device_readings, device_sessions)
+
+        recorded_ats = [reading["recorded_at"] for reading in device_readings]
+        if device_id in latest_reading_times:
+            recorded_ats.append(latest_reading_times[device_id])
+        latest_reading = max(recorded_ats, default=None)
+        ref_dates[device_id] = latest_reading.date() if latest_reading else None
+        window_starts[device_id] = datetime.combine(ref_dates[device_id] - timedelta(days=13), datetime.min.time()) if latest_reading else None
+
+    since = min((window_start for window_start in window_starts.values() if window_start), default=datetime.min)
+    reading_keys, session_keys = get_ingested_keys(db, device_ids, since)
+
+    readings, sessions = [], []
+    dates_by_device = {}
+    for device_id, (device_readings, device_sessions) in parsed.items():
+        window_start = window_starts[device_id]
+        device_readings = [
+            reading for reading in device_readings
+            if (device_id, reading["recorded_at"]) not in reading_keys
+            and (window_start is None or reading["recorded_at"] >= window_start)
+        ]
+        device_sessions = [
+            session for session in device_sessions
+            if (device_id, session["started_at"]) not in session_keys
+            and (window_start is None or session["started_at"] >= window_start)
+        ]
+        readings.extend(device_readings)
+        sessions.extend(device_sessions)
+        dates_by_device[device_id] = {reading["recorded_at"].date() for reading in device_readings} \
+            | {session["started_at"].date() for session in device_sessions}
+
+    bulk_insert_sensor_readings(db, readings, commit=False)
+    bulk_insert_clean_sessions(db, sessions, commit=False)
+    refresh_daily_aggregates(db, dates_by_device, commit=False)
+
+    aggregates_by_device = {device_id: [] for device_id in device_ids}
+    for row in get_daily_aggregates(db, device_ids):
+        aggregates_by_device[row.device_id].append(row)
+
+    hourly_rows, daily_rows = [], []
+    for device_id, data in batch:
+        aggregates = aggregates_by_device[device_id]
+        ref_date = ref_dates[device_id] or max((row.date for row in aggregates), default=None)
+
+        if ref_date is not None:
+            window_start = ref_date - timedelta(days=13)
+            delete_daily_aggregates_before(db, device_id, window_start, commit=False)
+            aggregates = [row for row in aggregates if window_start <= row.date <= ref_date]
+
+        buckets = {
+            row.date: [row.pm_sum, row.pm_count, row.clean_time, row.clean_amount, row.clean_count, row.earliest_created_at]
+            for row in aggregates
+        }
+        earliest_created_at = min((row.earliest_created_at for row in aggregates if row.earliest_created_at), default=None)
+        week_arrays = build_week_arrays(buckets, ref_date)
+
+        hourly_rows.append({
+            "device_id": device_id,
+            "timestamp": current_time,
+            "pm_current": data.get("pmCurrent"),
+            "period": get_period_str(earliest_created_at, current_time)
+        })
+        daily_rows.append({
+            "device_id": device_id,
+            "average_pm": week_arrays["averagePm"],
+            "average_clean_time": week_arrays["averageCleanTime"],
+            "average_clean_amount": week_arrays["averageCleanAmount"]
+        })
+
+    upsert_hourly_data(db, hourly_rows, commit=False)
+    upsert_daily_data(db, daily_rows, commit=False)
+    if commit:
+        db.commit()
+
+def parse_timestamp(value: str):
+    """
+    ISO 8601 문자열 -> naive datetime (기기 현지 시각)
+    - "+09:00" 같은 offset이 있으면 표기된 현지 시각은 그대로 두고 offset만 제거 (날짜 / 시간대 구분이 기존 pandas 집계와 같음)
+    - DB에는 naive 값으로 저장되므로 비교 / 저장 전에 모두 naive로 맞춤
+    """
+    timestamp = datetime.fromisoformat(value)
+    return timestamp.replace(tzinfo=None) if timestamp.tzinfo else timestamp
+
+def parse_sensor_readings(sensor_archive, device_id: int):
+    return [
+        {
+            "device_id": device_id,
+            "recorded_at": parse_timestamp(record["recordAt"]),
+            "pm": record.get("pm"),
+            "temperature": record.get("temperature"),
+            "humidity": record.get("humidity"),
+            "location": record.get("deviceLocation")
+        }
+        for record in sensor_archive or []
+    ]
+
+def parse_clean_sessions(clean_logs, device_id: int):
+    return [
+        {
+            "device_id": device_id,
+            "started_at": parse_timestamp(log["startedAt"]),
+            "finished_at": parse_timestamp(log["finishedAt"]),
+            "dust_level_before": log["dustLevelBefore"],
+            "dust_level_after": log["dustLevelAfter"],
+            "created_at": parse_timestamp(log["createdAt"]) if log.get("createdAt") else None
+        }
+        for log in clean_logs or []
+    ]
+
+def get_period_str(earliest_created_at, current_time):
     """
     period : YYYY-MM-DD ~ YYYY-MM-DD
     데이터X : period = null
     2주일치 : period = (yesterday-13) ~ yesterday
     1주일치 : period = (yesterday-6) ~ yesterday
+    - earliest_created_at : 집계 범위 내 CleanLog의 가장 이른 createdAt
     """
     yesterday = current_time.date() - timedelta(days=1)
-    if clean_logs:
-        created_dates = [datetime.fromisoformat(log["createdAt"]) for log in clean_logs]
-        earliest = min(created_dates)
-        if earliest.date() <= yesterday - timedelta(days=13):
+    if earliest_created_at:
+        if earliest_created_at.date() <= yesterday - timedelta(days=13):
             return f"{(yesterday - timedelta(days=13)).strftime('%Y-%m-%d')} ~ {yesterday.strftime('%Y-%m-%d')}"
-        elif earliest.date() <= yesterday - timedelta(days=6):
+        elif earliest_created_at.date() <= yesterday - timedelta(days=6):
             return f"{(yesterday - timedelta(days=6)).strftime('%Y-%m-%d')} ~ {yesterday.strftime('%Y-%m-%d')}"
     return f"{current_time.strftime('%Y-%m-%d')} ~ {current_time.strftime('%Y-%m-%d')}"
-
-def process_clean_log(clean_logs, sensor_archive):
-    """
-    CleanLog :
-        - 날짜별로 지속시간(시간 단위) 합산
-        - 날짜별로 총 공기정화량 합산 (dustLevelBefore - dustLevelAfter)
-        - 기준 날짜(ref_date)는 sensor_archive의 마지막 recordAt를 사용
-    """
-    if not clean_logs:
-        return [0] * 7, [0] * 7, [0] * 7, [0] * 7
-    if sensor_archive:
-        ref_date = max(datetime.fromisoformat(rec["recordAt"]) for rec in sensor_archive).date()
-
-    df_clean = pd.DataFrame(clean_logs)
-    df_clean["startedAt"] = pd.to_datetime(df_clean["startedAt"])
-    df_clean["finishedAt"] = pd.to_datetime(df_clean["finishedAt"])
-    df_clean["duration"] = (df_clean["finishedAt"] - df_clean["startedAt"]).dt.total_seconds() / 3600
-    df_clean["clean_amount"] = df_clean["dustLevelBefore"] - df_clean["dustLevelAfter"]
-    grouped_clean = df_clean.groupby(df_clean["startedAt"].dt.date).agg(
-        total_clean_time=("duration", "sum"),
-        total_clean_amount=("clean_amount", "sum")
-    )
-    last_week_clean_time, this_week_clean_time = [0] * 7, [0] * 7
-    last_week_clean_amount, this_week_clean_amount = [0] * 7, [0] * 7
-    for date, row in grouped_clean.iterrows():
-        weekday = date.weekday()
-        if date >= ref_date - timedelta(days=6):
-            this_week_clean_time[weekday] = int(round(row['total_clean_time']))
-            this_week_clean_amount[weekday] = int(round(row['total_clean_amount']))
-        else:
-            last_week_clean_time[weekday] = int(round(row['total_clean_time']))
-            last_week_clean_amount[weekday] = int(round(row['total_clean_amount']))
-    return last_week_clean_time, this_week_clean_time, last_week_clean_amount, this_week_clean_amount
-
-def process_sensor_archive(sensor_archive):
-    """
-    SensorArchive :
-        - 날짜별 미세먼지 평균 (소수점 1자리)
-        - 기준 날짜(ref_date)는 sensor_archive의 마지막 recordAt를 사용
-    """
-    if not sensor_archive:
-        return [0] * 7, [0] * 7
-
-    ref_date = max(datetime.fromisoformat(rec["recordAt"]) for rec in sensor_archive).date()
-    df_sensor = pd.DataFrame(sensor_archive)
-    df_sensor["recordAt"] = pd.to_datetime(df_sensor["recordAt"])
-    grouped_sensor = df_sensor.groupby(df_sensor["recordAt"].dt.date)["pm"].mean().round(1)
-    last_week_pm, this_week_pm = [0] * 7, [0] * 7
-    for date, avg_pm in grouped_sensor.items():
-        weekday = date.weekday()
-        if date >= ref_date - timedelta(days=6):
-            this_week_pm[weekday] = avg_pm
-        else:
-            last_week_pm[weekday] = avg_pm
-    return last_week_pm, this_week_pm
\ No newline at end of file
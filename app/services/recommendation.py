@@ -1,18 +1,57 @@
+import os
 import logging
-from fastapi import Request
+import threading
 from sqlalchemy.orm import Session
-from app.models.inference import run_inference
-from app.database.crud import update_recommendation
+from app.models.inference import run_inference, get_data, generate_recommendation_entries, stream_recommendations, create_entry
+from app.models.template import render_recommendations
+from app.database.connection import SessionLocal
+from app.database.crud import update_recommendation, get_recommendation, get_device_report
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-def generate_and_update_recommendation(db: Session, device_id: int, request: Request):
-    logger.info("Generating recommendation for device_id: %s", device_id)
+"""
+SERVING_MODE
+- llm : sLLM 추론 결과만 사용
+- template : 규칙 기반 문장만 사용 (sLLM 호출 없음)
+- llm-with-deadline : INSIGHT_DEADLINE_SECONDS 안에 생성되지 않은 인사이트는 규칙 기반 문장으로 먼저 저장하고,
+                      sLLM 생성이 끝나면 그 결과로 교체 (생성은 마감 이후에도 추천 큐의 워커 스레드와 슬롯을 계속 사용)
+"""
+SERVING_MODES = ("llm", "template", "llm-with-deadline")
+SERVING_MODE = os.getenv("SERVING_MODE", "llm")
+INSIGHT_DEADLINE_SECONDS = float(os.getenv("INSIGHT_DEADLINE_SECONDS", "10"))
+
+if SERVING_MODE not in SERVING_MODES:
+    logger.warning("Unknown SERVING_MODE %s, falling back to llm", SERVING_MODE)
+    SERVING_MODE = "llm"
+
+def generate_and_update_recommendation(db: Session, device_id: int, engine, serving_mode: str = SERVING_MODE, superseded=None):
+    """
+    superseded() : 같은 기기의 더 최신 작업이 대기 중인지 (llm-with-deadline에서 늦게 끝난 결과를 버릴지 판단)
+    - template 모드가 아닌데 모델이 없으면 마지막 추천을 덮어쓰지 않고 RuntimeError (작업은 failed, SSE 스트림과 같은 처리)
+    """
+    logger.info("Generating recommendation for device_id: %s (mode: %s)", device_id, serving_mode)
 
     try:
-        result = run_inference(db, device_id, request)
-        recommendations = result.get("recommendations", [])
+        device = get_device_report(db, device_id)
+        if not device:
+            logger.warning("Device %s not found; skipping recommendation", device_id)
+            return None
+
+        if serving_mode != "template" and engine is None:
+            raise RuntimeError("AI Model is not loaded; keeping the last recommendation")
+
+        data = get_data(db, device_id, device)
+        previous = get_previous_entries(device)
+        if serving_mode == "template":
+            recommendations = [create_entry(text) for text in render_recommendations(data)]
+        elif serving_mode == "llm-with-deadline":
+            recommendations, served = generate_with_deadline(data, device_id, engine, previous)
+            if served is not None:
+                return replace_late_recommendation(db, device_id, served, recommendations, superseded)
+        else:
+            result = run_inference(db, device_id, engine, previous, data)
+            recommendations = result.get("entries", [])
 
         if not recommendations:
             logger.warning("No recommendations generated for device_id: %s", device_id)
@@ -28,4 +67,116 @@ def generate_and_update_recommendation(db: Session, device_id: int, request: Req
 
     except Exception as e:
         logger.error("Error during recommendation generation and update for device_id %s: %s", device_id, str(e))
-        raise e
\ No newline at end of file
+        raise e
+
+def get_previous_entries(device):
+    return device.recommendation.get_entries() if device.recommendation else None
+
+def generate_with_deadline(data, device_id: int, engine, previous=None, deadline: float = INSIGHT_DEADLINE_SECONDS):
+    """
+    호출한 스레드에서 sLLM으로 생성하고, 마감 시간이 지나면 타이머 스레드에서 추천을 먼저 저장
+    - 먼저 저장하는 추천 : 마감 전에 확정된 인사이트는 sLLM 결과, 나머지는 템플릿 결과
+    - 반환 : (sLLM 결과, 먼저 저장한 추천 또는 None)
+    """
+    generated = {}
+    lock = threading.Lock()
+    state = {"finished": False, "served": None}
+
+    def serve_fallback():
+        with lock:
+            if state["finished"]:
+                return
+            fallback = render_recommendations(data)
+            served = [generated.get(index, create_entry(fallback[index])) for index in range(4)]
+            logger.warning(
+                "Inference for device_id %s exceeded %.1fs; serving %s insight(s) from template",
+                device_id, deadline, 4 - len(generated)
+            )
+            save_recommendation(device_id, served)
+            state["served"] = served
+
+    timer = threading.Timer(deadline, serve_fallback)
+    timer.daemon = True
+    timer.start()
+    try:
+        recommendations = generate_recommendation_entries(data, engine, previous, generated.__setitem__)
+    finally:
+        timer.cancel()
+        with lock:
+            state["finished"] = True
+
+    return recommendations, state["served"]
+
+def save_recommendation(device_id: int, recommendations):
+    """
+    요청 세션과 다른 스레드에서 저장하므로 별도 세션 사용
+    """
+    db = SessionLocal()
+    try:
+        update_recommendation(db, device_id, recommendations)
+    except Exception as e:
+        logger.error("Error saving template recommendation for device_id %s: %s", device_id, str(e))
+    finally:
+        db.close()
+
+def replace_late_recommendation(db: Session, device_id: int, served, recommendations, superseded=None):
+    """
+    마감 시간 이후 완료된 sLLM 결과로 템플릿 결과 교체
+    - 같은 기기의 더 최신 작업이 대기 중이거나 그 사이 더 최신 추천이 저장되었다면 덮어쓰지 않음
+    """
+    if superseded and superseded():
+        logger.info("Newer job is queued for device_id %s; dropping late result", device_id)
+        return None
+
+    db.expire_all()
+    reco = get_recommendation(db, device_id)
+    if reco and reco.get_entries() != served:
+        logger.info("Newer recommendation exists for device_id %s; dropping late result", device_id)
+        return None
+
+    updated_reco = update_recommendation(db, device_id, recommendations)
+    logger.info("Replaced template recommendation with late LLM result for device_id: %s", device_id)
+    return updated_reco
+
+def stream_and_update_recommendation(device_id: int, engine, serving_mode: str = SERVING_MODE):
+    """
+    인사이트를 생성하면서 (event, payload)를 yield하고, 완료 후 update_recommendation으로 저장
+    - 스트리밍 응답은 요청 의존성 세션보다 오래 유지되므로 별도 세션 사용
+    """
+    logger.info("Streaming recommendation for device_id: %s", device_id)
+
+    db = SessionLocal()
+    try:
+        device = get_device_report(db, device_id)
+        if not device:
+            yield "error", {"deviceId": device_id, "message": "기기를 찾을 수 없습니다."}
+            return
+
+        if serving_mode != "template" and engine is None:
+            logger.error("AI Model is not loaded; cannot stream recommendation for device_id %s", device_id)
+            yield "error", {"deviceId": device_id, "message": "AI 모델을 사용할 수 없습니다."}
+            return
+
+        data = get_data(db, device_id, device)
+        if serving_mode == "template":
+            events = (
+                ("insight", {"insightNumber": index + 1, "recommendation": text, "entry": create_entry(text)})
+                for index, text in enumerate(render_recommendations(data))
+            )
+        else:
+            events = stream_recommendations(data, engine, get_previous_entries(device))
+
+        entries = []
+        for event, payload in events:
+            if event == "insight":
+                entries.append(payload.pop("entry"))
+            yield event, payload
+
+        update_recommendation(db, device_id, entries)
+        yield "done", {"deviceId": device_id, "recommendations": [entry["recommendation"] for entry in entries]}
+
+    except Exception as e:
+        logger.error("Error during recommendation streaming for device_id %s: %s", device_id, str(e))
+        yield "error", {"deviceId": device_id, "message": "서비스 오류가 발생했습니다."}
+    finally:
+        db.close()
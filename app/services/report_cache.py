@@ -0,0 +1,59 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "10000"))
+
+class ReportCache:
+    """
+    주간 리포트 응답(JSON bytes) 캐시
+    - device_id별로 마지막 report_version의 응답 하나만 유지 (LRU)
+    - report_version은 DB에 저장되므로 다른 워커가 데이터를 바꿔도 버전이 달라져 캐시를 쓰지 않음
+    """
+    def __init__(self, max_size: int = REPORT_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, device_id: int, version: int) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(device_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(device_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, device_id: int, version: int, body: bytes):
+        with self.lock:
+            entry = self.entries.get(device_id)
+            if entry is not None and entry[0] > version:
+                return
+            self.entries[device_id] = (version, body)
+            self.entries.move_to_end(device_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxSize": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / total, 3) if total else 0.0
+            }
+
+report_cache = ReportCache()
+
+def make_etag(device_id: int, version: int) -> str:
+    return f'"{device_id}-{version}"'
\ No newline at end of file
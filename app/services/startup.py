@@ -0,0 +1,47 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+class StartupReport:
+    """
+    서버 시작 단계별 소요 시간(초)
+    - phases : {"import_app", "init_db", "start_queue", "load_model", ...}
+    - model_status : loading -> ready / failed (SERVING_MODE=template이면 skipped)
+    - ready_after : 프로세스가 app을 import하기 시작한 시점부터 준비 완료까지 걸린 시간
+    """
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.model_status = "loading"
+        self.ready_after: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - started_at, 3)
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = round(seconds, 3)
+
+    def mark_model(self, status: str):
+        self.model_status = status
+        self.ready_after = round(time.perf_counter() - self.started_at, 3)
+        logger.info("Startup report: %s", self.to_dict())
+
+    @property
+    def ready(self) -> bool:
+        return self.model_status in ("ready", "skipped")
+
+    def to_dict(self):
+        return {
+            "modelStatus": self.model_status,
+            "phases": dict(self.phases),
+            "readyAfterSeconds": self.ready_after
+        }
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import json
+import timeit
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+"""
+DAILY POST 전처리 벤치마크 (pandas 기반 기존 구현 vs ingest_daily_batch)
+python -m benchmarks.bench_preprocess --payload dummy.json
+
+- ingest_daily_batch는 원본 저장 / 일별 집계 / 주간 배열 계산까지 DB를 포함해 측정 (DATABASE_URL이 없으면 임시 SQLite 파일)
+  - first_upload : 처음 업로드하는 기기 (매 호출마다 새 device_id)
+  - repost : 같은 데이터를 다시 보낸 기기 (이미 저장된 행은 건너뜀)
+- pandas는 주간 배열 계산만 측정하므로 DB 저장이 포함된 ingest 수치와 직접 비교하지 말고 identical_output으로 결과만 확인
+(app 모듈은 환경 변수를 import 시점에 읽으므로 app import는 모두 함수 안에서 수행)
+"""
+
+def pandas_week_arrays(clean_logs, sensor_archive):
+    """
+    기존 app/services/preprocess.py 구현 (process_clean_log + process_sensor_archive + get_period_str)
+    """
+    import pandas as pd
+
+    created_dates = [datetime.fromisoformat(log["createdAt"]) for log in clean_logs]
+    min(created_dates)
+
+    ref_date = max(datetime.fromisoformat(rec["recordAt"]) for rec in sensor_archive).date()
+    df_clean = pd.DataFrame(clean_logs)
+    df_clean["startedAt"] = pd.to_datetime(df_clean["startedAt"])
+    df_clean["finishedAt"] = pd.to_datetime(df_clean["finishedAt"])
+    df_clean["duration"] = (df_clean["finishedAt"] - df_clean["startedAt"]).dt.total_seconds() / 3600
+    df_clean["clean_amount"] = df_clean["dustLevelBefore"] - df_clean["dustLevelAfter"]
+    grouped_clean = df_clean.groupby(df_clean["startedAt"].dt.date).agg(
+        total_clean_time=("duration", "sum"),
+        total_clean_amount=("clean_amount", "sum")
+    )
+    last_week_clean_time, this_week_clean_time = [0] * 7, [0] * 7
+    last_week_clean_amount, this_week_clean_amount = [0] * 7, [0] * 7
+    for date, row in grouped_clean.iterrows():
+        weekday = date.weekday()
+        if date >= ref_date - timedelta(days=6):
+            this_week_clean_time[weekday] = int(round(row['total_clean_time']))
+            this_week_clean_amount[weekday] = int(round(row['total_clean_amount']))
+        else:
+            last_week_clean_time[weekday] = int(round(row['total_clean_time']))
+            last_week_clean_amount[weekday] = int(round(row['total_clean_amount']))
+
+    ref_date = max(datetime.fromisoformat(rec["recordAt"]) for rec in sensor_archive).date()
+    df_sensor = pd.DataFrame(sensor_archive)
+    df_sensor["recordAt"] = pd.to_datetime(df_sensor["recordAt"])
+    grouped_sensor = df_sensor.groupby(df_sensor["recordAt"].dt.date)["pm"].mean().round(1)
+    last_week_pm, this_week_pm = [0] * 7, [0] * 7
+    for date, avg_pm in grouped_sensor.items():
+        weekday = date.weekday()
+        if date >= ref_date - timedelta(days=6):
+            this_week_pm[weekday] = avg_pm
+        else:
+            last_week_pm[weekday] = avg_pm
+
+    return {
+        "averagePm": [last_week_pm, this_week_pm],
+        "averageCleanTime": [last_week_clean_time, this_week_clean_time],
+        "averageCleanAmount": [last_week_clean_amount, this_week_clean_amount]
+    }
+
+class IngestRunner:
+    """
+    ingest_daily_batch 호출기 (repost=False면 호출마다 새 device_id로 업로드)
+    """
+    def __init__(self, db, payload: dict, repost: bool, first_device_id: int):
+        self.db = db
+        self.payload = payload
+        self.repost = repost
+        self.device_id = first_device_id
+
+    def __call__(self, clean_logs, sensor_archive):
+        from app.services.preprocess import ingest_daily_batch
+
+        if not self.repost:
+            self.device_id += 1
+        ingest_daily_batch(self.db, [(self.device_id, {**self.payload, "CleanLog": clean_logs, "SensorArchive": sensor_archive})])
+
+def stored_week_arrays(db, device_id: int):
+    from app.services.json_load import load_device_json
+
+    report = load_device_json(db, device_id)
+    return {key: report[key] for key in ("averagePm", "averageCleanTime", "averageCleanAmount")}
+
+def measure(func, clean_logs, sensor_archive, number):
+    seconds = min(timeit.repeat(lambda: func(clean_logs, sensor_archive), number=number, repeat=5)) / number
+
+    tracemalloc.start()
+    func(clean_logs, sensor_archive)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mean_us": round(seconds * 1e6, 1),
+        "peak_alloc_kib": round(peak / 1024, 1)
+    }
+
+def run(payload_path: str, number: int):
+    from app.database.connection import init_db, SessionLocal
+
+    with open(payload_path, encoding="utf-8") as f:
+        payload = json.load(f)
+    clean_logs = payload.get("CleanLog", [])
+    sensor_archive = payload.get("SensorArchive", [])
+
+    init_db()
+    results = {"payload": payload_path, "sensor_rows": len(sensor_archive), "clean_logs": len(clean_logs)}
+    with SessionLocal() as db:
+        results["first_upload"] = measure(IngestRunner(db, payload, repost=False, first_device_id=1000000), clean_logs, sensor_archive, number)
+        repost = IngestRunner(db, payload, repost=True, first_device_id=2000000)
+        repost(clean_logs, sensor_archive)
+        results["repost"] = measure(repost, clean_logs, sensor_archive, number)
+        actual = stored_week_arrays(db, repost.device_id)
+
+    try:
+        expected = pandas_week_arrays(clean_logs, sensor_archive)
+    except ImportError:
+        results["pandas"] = None
+        return results
+
+    results["identical_output"] = json.dumps(expected) == json.dumps(actual)
+    results["pandas"] = measure(pandas_week_arrays, clean_logs, sensor_archive, number)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DAILY POST 전처리 벤치마크")
+    parser.add_argument("--payload", default="dummy.json")
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir, 'bench_preprocess.db')}")
+
+        import logging
+        logging.disable(logging.INFO)
+
+        print(json.dumps(run(args.payload, args.number), indent=2))
@@ -0,0 +1,316 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+"""
+오프라인 벤치마크 모음 (CPU, 네트워크 없이 실행, 결과는 JSON)
+python -m benchmarks.bench_suite --output bench.json
+python -m benchmarks.bench_suite --only ingest report_read --scales 1 4 16
+
+- ingest : dummy.json을 scale배로 늘린 payload로 process_daily_post (요청마다 새 기기)
+- report_read : 기기 --devices대가 저장된 SQLite DB에서 load_device_json / 캐시된 load_device_json_bytes
+- routes : ASGI 앱(httpx ASGITransport)으로 POST daily, GET weekly(200), GET weekly(If-None-Match, 304)
+- inference : 무작위 초기화한 작은 Gemma2 모델과 프롬프트로 학습한 BPE tokenizer로 generate_recommendations (--assisted-decoding으로 assisted decoding 비교)
+
+DATABASE_URL을 지정하지 않으면 임시 디렉터리의 SQLite 파일을 사용하고, SERVING_MODE는 template으로 고정
+(app 모듈은 환경 변수를 import 시점에 읽으므로 app import는 모두 함수 안에서 수행)
+"""
+
+SECTIONS = ("ingest", "report_read", "routes", "inference")
+ROUTE_PREFIX = "/v1/ssafyA104/AI"
+
+def summarize(samples):
+    """
+    samples : 호출별 소요 시간(초)
+    """
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1e3, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1e3, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e3, 3),
+        "min_ms": round(ordered[0] * 1e3, 3),
+        "ops_per_sec": round(len(ordered) / sum(ordered), 1) if sum(ordered) else None
+    }
+
+def measure(func, repeat: int, warmup: int = 1):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started_at)
+    return summarize(samples)
+
+def scale_payload(payload: dict, scale: int) -> dict:
+    """
+    SensorArchive / CleanLog를 scale배로 늘림 (복사본마다 시각을 1초씩 밀어 PK가 겹치지 않게 하고 날짜 구간은 유지)
+    """
+    def shifted(value: str, seconds: int) -> str:
+        return (datetime.fromisoformat(value) + timedelta(seconds=seconds)).isoformat()
+
+    sensor_archive, clean_logs = [], []
+    for copy in range(scale):
+        sensor_archive.extend({**record, "recordAt": shifted(record["recordAt"], copy)} for record in payload.get("SensorArchive", []))
+        clean_logs.extend({
+            **log,
+            "startedAt": shifted(log["startedAt"], copy),
+            "finishedAt": shifted(log["finishedAt"], copy),
+            "createdAt": shifted(log["createdAt"], copy)
+        } for log in payload.get("CleanLog", []))
+    return {**payload, "SensorArchive": sensor_archive, "CleanLog": clean_logs}
+
+def bench_ingest(payload: dict, scales, repeat: int):
+    from app.database.connection import SessionLocal
+    from app.services.preprocess import process_daily_post
+
+    device_ids = iter(range(1_000_000, 2_000_000))
+    results = []
+    with SessionLocal() as db:
+        for scale in scales:
+            data = scale_payload(payload, scale)
+            stats = measure(lambda: process_daily_post(db, data, next(device_ids)), repeat)
+            results.append({
+                "scale": scale,
+                "sensor_rows": len(data["SensorArchive"]),
+                "clean_logs": len(data["CleanLog"]),
+                **stats,
+                "rows_per_sec": round((len(data["SensorArchive"]) + len(data["CleanLog"])) * 1e3 / stats["mean_ms"])
+            })
+    return results
+
+def bench_report_read(payload: dict, devices: int, repeat: int):
+    from app.database.connection import SessionLocal
+    from app.database.crud import get_report_version
+    from app.services.json_load import load_device_json, load_device_json_bytes
+    from app.services.preprocess import process_daily_bulk_post
+
+    device_ids = list(range(2_000_000, 2_000_000 + devices))
+    with SessionLocal() as db:
+        process_daily_bulk_post(db, [{**payload, "deviceId": device_id} for device_id in device_ids])
+        versions = {device_id: get_report_version(db, device_id) for device_id in device_ids}
+
+        def read_all():
+            for device_id in device_ids:
+                load_device_json(db, device_id)
+
+        def read_all_cached():
+            for device_id in device_ids:
+                load_device_json_bytes(db, device_id, versions[device_id])
+
+        load = measure(read_all, repeat)
+        cached = measure(read_all_cached, repeat)
+
+    return {
+        "devices": devices,
+        "load_device_json": {**load, "devices_per_sec": round(devices * 1e3 / load["mean_ms"])},
+        "load_device_json_bytes_cached": {**cached, "devices_per_sec": round(devices * 1e3 / cached["mean_ms"])}
+    }
+
+async def wait_for_job(client, job_id: str, timeout: float):
+    """
+    추천 생성 작업이 끝날 때까지 /jobs/{jobId}를 조회하고, 이어서 대기열이 빌 때까지 대기 (마지막 작업 상태 반환)
+    """
+    deadline = time.perf_counter() + timeout
+    status = None
+    while job_id and time.perf_counter() < deadline:
+        status = (await client.get(f"{ROUTE_PREFIX}/jobs/{job_id}")).json().get("status")
+        if status in ("done", "failed"):
+            break
+        await asyncio.sleep(0.05)
+    while time.perf_counter() < deadline:
+        queue = (await client.get(f"{ROUTE_PREFIX}/inference/queue")).json()
+        if queue["depth"] == 0 and queue["running"] == 0:
+            break
+        await asyncio.sleep(0.05)
+    return status
+
+async def bench_routes_async(payload: dict, repeat: int):
+    import httpx
+    from app.main import app
+
+    device_id = 3_000_000
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def timed_requests(name, send, expected_status):
+                response = await send()
+                samples, statuses = [], {}
+                for _ in range(repeat):
+                    started_at = time.perf_counter()
+                    response = await send()
+                    samples.append(time.perf_counter() - started_at)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                results[name] = {**summarize(samples), "statuses": statuses, "ok": set(statuses) == {expected_status}}
+                return response
+
+            url = f"{ROUTE_PREFIX}/devices/{device_id}/report"
+            posted = await timed_requests("post_daily", lambda: client.post(f"{url}/daily", json=payload), 202)
+
+            # 추천 생성 작업이 report_version을 올리므로 작업이 끝난 뒤의 ETag로 304를 측정
+            results["post_daily"]["job"] = await wait_for_job(client, posted.json().get("jobId"), timeout=60.0)
+            etag = (await client.get(f"{url}/weekly")).headers.get("etag", "")
+            await timed_requests("get_weekly", lambda: client.get(f"{url}/weekly"), 200)
+            await timed_requests("get_weekly_not_modified", lambda: client.get(f"{url}/weekly", headers={"If-None-Match": etag}), 304)
+    return results
+
+def build_tiny_engine(max_new_tokens: int, prefix_cache: bool):
+    """
+    네트워크 없이 만들 수 있는 작은 모델
+    - tokenizer : 고정 프롬프트(지시문 + 예시)로 학습한 byte-level BPE
+    - model : 무작위 초기화한 2-layer Gemma2 (출력 품질이 아니라 generate 경로의 소요 시간 측정용)
+    """
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import Gemma2Config, Gemma2ForCausalLM, PreTrainedTokenizerFast
+    from app.models.engine import InferenceEngine
+    from app.models.fewshot_prompt import PROMPT_PREFIXES
+    from app.models.prefix_cache import PrefixCache
+    from app.models.prompt_ids import PromptIds
+
+    torch.manual_seed(0)
+    corpus = list(PROMPT_PREFIXES.values())
+
+    bpe = Tokenizer(models.BPE(unk_token="<unk>"))
+    bpe.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    bpe.decoder = decoders.ByteLevel()
+    bpe.train_from_iterator(corpus, trainers.BpeTrainer(
+        vocab_size=1024,
+        special_tokens=["<pad>", "<eos>", "<bos>", "<unk>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    ))
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=bpe,
+        pad_token="<pad>",
+        eos_token="<eos>",
+        bos_token="<bos>",
+        unk_token="<unk>",
+        model_input_names=["input_ids", "attention_mask"]
+    )
+
+    config = Gemma2Config(
+        vocab_size=len(tokenizer),
+        hidden_size=64,
+        intermediate_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        head_dim=16,
+        max_position_embeddings=8192,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        bos_token_id=tokenizer.bos_token_id
+    )
+    model = Gemma2ForCausalLM(config).eval()
+
+    engine = InferenceEngine(
+        tokenizer,
+        model,
+        PrefixCache(tokenizer, model).build() if prefix_cache else None,
+        result_cache=None,
+        prompt_ids=PromptIds(tokenizer).build()
+    )
+    engine.generation_config.max_new_tokens = max_new_tokens
+    return engine
+
+def bench_inference(repeat: int, max_new_tokens: int, prefix_cache: bool, assisted_decoding: str = "none"):
+    from app.models.inference import generate_recommendations
+    from app.models.model_test import MOCK_DATA
+
+    started_at = time.perf_counter()
+    engine = build_tiny_engine(max_new_tokens, prefix_cache)
+    if assisted_decoding != "none":
+        engine.enable_assisted_decoding(assisted_decoding)
+    build_seconds = time.perf_counter() - started_at
+
+    results = {
+        "max_new_tokens": max_new_tokens,
+        "prefix_cache": sorted(engine.prefix_cache.entries) if engine.prefix_cache else [],
+        "assisted_decoding": engine.assisted.describe() if engine.assisted else None,
+        "build_ms": round(build_seconds * 1e3, 1)
+    }
+    for name, data in (("one_week", MOCK_DATA[1]), ("two_week", MOCK_DATA[2])):
+        results[name] = measure(lambda: generate_recommendations(data, engine), repeat)
+    return results
+
+def environment():
+    import sqlalchemy
+
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "database_url": os.environ["DATABASE_URL"]
+    }
+    try:
+        import torch
+        import transformers
+
+        info.update({"torch": torch.__version__, "transformers": transformers.__version__, "torch_threads": torch.get_num_threads()})
+    except ImportError:
+        pass
+    return info
+
+def run(args):
+    with open(args.payload, encoding="utf-8") as f:
+        payload = json.load(f)
+
+    from app.database.connection import init_db
+
+    init_db()
+    results = {"started_at": datetime.now(timezone.utc).isoformat(), "environment": environment()}
+    sections = args.only or SECTIONS
+
+    if "ingest" in sections:
+        results["ingest"] = bench_ingest(payload, args.scales, args.repeat)
+    if "report_read" in sections:
+        results["report_read"] = bench_report_read(payload, args.devices, args.repeat)
+    if "routes" in sections:
+        results["routes"] = asyncio.run(bench_routes_async(payload, args.requests))
+    if "inference" in sections:
+        try:
+            results["inference"] = bench_inference(args.inference_repeat, args.max_new_tokens, not args.no_prefix_cache, args.assisted_decoding)
+        except ImportError as e:
+            results["inference"] = {"skipped": str(e)}
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="오프라인 벤치마크 모음 (ingest / report_read / routes / inference)")
+    parser.add_argument("--payload", default="dummy.json")
+    parser.add_argument("--only", nargs="+", choices=SECTIONS)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--inference-repeat", type=int, default=3)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--no-prefix-cache", action="store_true")
+    parser.add_argument("--assisted-decoding", choices=("none", "prompt-lookup", "draft-model"), default="none")
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (없으면 stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        os.environ["SERVING_MODE"] = "template"
+
+        import logging
+        logging.disable(logging.INFO)
+
+        results = run(args)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
\ No newline at end of file
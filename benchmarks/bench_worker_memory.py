@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+import psutil
+
+"""
+멀티 워커 메모리 벤치마크 (gunicorn --preload 공유 모델 vs 워커별 모델 로드)
+python -m benchmarks.bench_worker_memory --workers 1 2 4
+
+- rss : 프로세스가 매핑한 전체 메모리 (공유 페이지 포함, 워커끼리 중복 계산됨)
+- uss : 프로세스 고유 메모리 (워커 하나를 추가할 때 늘어나는 메모리)
+- pss : 공유 페이지를 공유 프로세스 수로 나눈 값 (합계 = 실제 전체 사용량)
+"""
+
+ROOT_URL = "http://127.0.0.1:{port}/v1/ssafyA104/AI/"
+
+def wait_until_ready(port: int, workers: int, timeout: float):
+    """
+    모든 워커가 응답할 때까지 대기 (응답한 워커 pid는 구분할 수 없으므로 연속 성공 횟수로 판단)
+    """
+    deadline = time.monotonic() + timeout
+    successes = 0
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(ROOT_URL.format(port=port), timeout=5) as response:
+                successes = successes + 1 if response.status == 200 else 0
+        except OSError:
+            successes = 0
+        if successes >= workers * 4:
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"Server did not become ready within {timeout}s")
+
+def wait_until_stable(master: psutil.Process, settle: float, timeout: float):
+    """
+    워커의 startup(모델 로드)이 끝나 전체 RSS가 더 이상 늘지 않을 때까지 대기
+    """
+    deadline = time.monotonic() + timeout
+    previous = -1
+    while time.monotonic() < deadline:
+        current = sum(process.memory_info().rss for process in [master, *master.children()])
+        if abs(current - previous) < 4 * 1024 * 1024:
+            return
+        previous = current
+        time.sleep(settle)
+
+def snapshot(master: psutil.Process):
+    def info(process):
+        memory = process.memory_full_info()
+        return {"pid": process.pid, "rss_mib": memory.rss / 2 ** 20, "uss_mib": memory.uss / 2 ** 20, "pss_mib": memory.pss / 2 ** 20}
+
+    workers = [info(process) for process in master.children()]
+    master_info = info(master)
+    return {
+        "master": {key: round(value, 1) for key, value in master_info.items()},
+        "worker_processes": [{key: round(value, 1) for key, value in worker.items()} for worker in workers],
+        "total_pss_mib": round(master_info["pss_mib"] + sum(worker["pss_mib"] for worker in workers), 1),
+        "per_worker_uss_mib": round(sum(worker["uss_mib"] for worker in workers) / len(workers), 1) if workers else 0.0
+    }
+
+def run_server(workers: int, preload: bool, port: int, timeout: float, settle: float):
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PRELOAD_MODEL": "true" if preload else "false",
+        "BIND": f"127.0.0.1:{port}"
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        master = psutil.Process(server.pid)
+        wait_until_ready(port, workers, timeout)
+        wait_until_stable(master, settle, timeout)
+        return snapshot(master)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+def run(worker_counts, port: int, timeout: float, settle: float):
+    results = []
+    for workers in worker_counts:
+        for preload in (True, False):
+            result = run_server(workers, preload, port, timeout, settle)
+            results.append({"workers": workers, "preload": preload, **result})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="멀티 워커 메모리 벤치마크")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--settle", type=float, default=2)
+    args = parser.parse_args()
+    print(json.dumps(run(args.workers, args.port, args.timeout, args.settle), indent=2))
\ No newline at end of file
@@ -0,0 +1,132 @@
+import json
+import random
+import argparse
+import statistics
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+"""
+가상 공기청정기 fleet 생성 (dummy.json 한 대분 데이터를 기기 N대로 확장)
+python -m benchmarks.fleet --devices 10000 --history-days 14 --output fleet.jsonl
+
+- dummy.json에서 시간대별 평균 PM, 온도 / 습도 분포, 청정 세션(시간, 전후 먼지 농도) 분포를 추출
+- 기기마다 device_id로 고정된 난수로 PM 배율, 하루 청정 횟수, 설치 위치를 정하므로 같은 seed면 같은 데이터 생성
+- 출력(JSONL)은 한 줄에 기기 하나이며 /devices/report/daily/bulk 항목 형식({"deviceId", "pmCurrent", "SensorArchive", "CleanLog"})
+"""
+
+class DeviceProfile:
+    def __init__(self, device_id: int, location: str, pm_scale: float, cleans_per_day: float):
+        self.device_id = device_id
+        self.location = location
+        self.pm_scale = pm_scale
+        self.cleans_per_day = cleans_per_day
+
+class FleetGenerator:
+    def __init__(self, template: dict, seed: int = 0, end_date: Optional[date] = None):
+        sensor_archive = template.get("SensorArchive", [])
+        clean_logs = template.get("CleanLog", [])
+        self.seed = seed
+        self.end_date = end_date or date.today()
+
+        pm_by_hour = {hour: [] for hour in range(24)}
+        for record in sensor_archive:
+            pm_by_hour[datetime.fromisoformat(record["recordAt"]).hour].append(record["pm"])
+        overall_pm = statistics.fmean(record["pm"] for record in sensor_archive) if sensor_archive else 30.0
+        self.hourly_pm = [statistics.fmean(values) if values else overall_pm for values in pm_by_hour.values()]
+        self.pm_noise = statistics.pstdev(record["pm"] for record in sensor_archive) / 2 if len(sensor_archive) > 1 else 2.0
+        self.pm_current = template.get("pmCurrent", overall_pm)
+
+        self.temperature = [record["temperature"] for record in sensor_archive] or [22.0]
+        self.humidity = [record["humidity"] for record in sensor_archive] or [45.0]
+        self.locations = sorted({record["deviceLocation"] for record in sensor_archive}) or ["Living Room"]
+
+        self.sessions = [(
+            datetime.fromisoformat(log["startedAt"]).time(),
+            datetime.fromisoformat(log["finishedAt"]) - datetime.fromisoformat(log["startedAt"]),
+            log["dustLevelBefore"],
+            log["dustLevelAfter"]
+        ) for log in clean_logs] or [(time(9), timedelta(hours=1), 50, 20)]
+        days = len({datetime.fromisoformat(log["startedAt"]).date() for log in clean_logs}) or 1
+        self.cleans_per_day = len(clean_logs) / days if clean_logs else 1.0
+
+    def rng(self, device_id: int, salt: str = "") -> random.Random:
+        return random.Random(f"{self.seed}:{device_id}:{salt}")
+
+    def profile(self, device_id: int) -> DeviceProfile:
+        rng = self.rng(device_id)
+        return DeviceProfile(
+            device_id,
+            rng.choice(self.locations),
+            rng.lognormvariate(0, 0.35),
+            max(0.2, rng.gauss(self.cleans_per_day, 1.0))
+        )
+
+    def daily_payload(self, device_id: int, history_days: int = 14) -> dict:
+        """
+        end_date 전날까지 history_days일치 SensorArchive(1시간 간격) / CleanLog
+        - history_days=1이면 /daily/delta 업로드 형식 (전날 하루치)
+        """
+        profile = self.profile(device_id)
+        rng = self.rng(device_id, f"daily:{self.end_date.isoformat()}:{history_days}")
+        start = datetime.combine(self.end_date - timedelta(days=history_days), time())
+
+        sensor_archive, clean_logs = [], []
+        for day in range(history_days):
+            day_start = start + timedelta(days=day)
+            for hour in range(24):
+                sensor_archive.append({
+                    "deviceId": device_id,
+                    "recordAt": (day_start + timedelta(hours=hour)).isoformat(),
+                    "deviceLocation": profile.location,
+                    "pm": round(max(0.0, self.hourly_pm[hour] * profile.pm_scale + rng.gauss(0, self.pm_noise)), 1),
+                    "temperature": round(rng.choice(self.temperature) + rng.gauss(0, 0.5), 1),
+                    "humidity": round(rng.choice(self.humidity) + rng.gauss(0, 1.5), 1)
+                })
+
+            sessions = int(profile.cleans_per_day) + (rng.random() < profile.cleans_per_day % 1)
+            for started_time, duration, dust_before, dust_after in sorted(rng.sample(self.sessions, min(sessions, len(self.sessions)))):
+                started_at = datetime.combine(day_start.date(), started_time) + timedelta(minutes=rng.randint(-30, 30))
+                started_at = max(started_at, day_start)
+                finished_at = started_at + duration
+                before = max(1, round(dust_before * profile.pm_scale))
+                clean_logs.append({
+                    "startedAt": started_at.isoformat(),
+                    "finishedAt": finished_at.isoformat(),
+                    "dustLevelBefore": before,
+                    "dustLevelAfter": min(before, max(0, round(dust_after * profile.pm_scale))),
+                    "createdAt": finished_at.isoformat()
+                })
+
+        return {
+            "deviceId": device_id,
+            "pmCurrent": self.hourly_payload(device_id, 0)["pmCurrent"],
+            "SensorArchive": sensor_archive,
+            "CleanLog": clean_logs
+        }
+
+    def hourly_payload(self, device_id: int, hour: int) -> dict:
+        profile = self.profile(device_id)
+        rng = self.rng(device_id, f"hourly:{self.end_date.isoformat()}:{hour}")
+        pm = self.hourly_pm[hour % 24] * profile.pm_scale + rng.gauss(0, self.pm_noise)
+        return {"pmCurrent": round(max(0.0, pm), 4)}
+
+def load_template(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="dummy.json 기반 가상 fleet 생성 (JSONL)")
+    parser.add_argument("--template", default="dummy.json")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--first-device-id", type=int, default=1)
+    parser.add_argument("--history-days", type=int, default=14)
+    parser.add_argument("--end-date", type=date.fromisoformat, help="YYYY-MM-DD (기본값 오늘, 전날까지 생성)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="fleet.jsonl")
+    args = parser.parse_args()
+
+    generator = FleetGenerator(load_template(args.template), seed=args.seed, end_date=args.end_date)
+    with open(args.output, "w", encoding="utf-8") as f:
+        for device_id in range(args.first_device_id, args.first_device_id + args.devices):
+            f.write(json.dumps(generator.daily_payload(device_id, args.history_days), ensure_ascii=False) + "\n")
+    print(json.dumps({"devices": args.devices, "history_days": args.history_days, "output": args.output}))
\ No newline at end of file
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from benchmarks.fleet import FleetGenerator, load_template
+
+"""
+가상 fleet 부하 테스트 (asyncio open-loop 부하 생성)
+python -m benchmarks.load_test --devices 10000 --hourly-rate 50 --duration 60 --daily-devices 2000 --daily-rate 100
+python -m benchmarks.load_test --base-url http://127.0.0.1:8000 ...   # 실행 중인 서버 대상
+
+- hourly : --duration초 동안 평균 --hourly-rate req/s(포아송 도착)로 기기를 돌아가며 POST /hourly
+- daily : --burst-at초부터 --daily-devices대가 평균 --daily-rate req/s로 POST /daily (자정 업로드 몰림), --daily-mode delta면 /daily/delta로 전날 하루치만 전송
+- 응답을 기다리지 않고 예정된 시각에 요청을 보내며, latency는 예정된 도착 시각부터 측정 (--max-in-flight 초과로 대기한 시간 포함)
+- --base-url이 없으면 같은 프로세스의 ASGI 앱(임시 SQLite DB)에 StubEngine을 넣어 실행 (모델 없이 노트북에서 실행 가능)
+"""
+
+ROUTE_PREFIX = "/v1/ssafyA104/AI"
+STUB_COMPLETION = " 이번주 평균 미세먼지 농도는 30.5입니다."
+
+class StubEngine:
+    """
+    generate / stream만 흉내 내는 모델 대역
+    - 배치 생성은 행 수와 무관하게 prefill + 토큰 수 x 토큰당 시간만큼 sleep (한 번의 generate로 모든 행을 디코딩하므로)
+    """
+    result_cache = None
+    prefix_cache = None
+
+    def __init__(self, prefill_seconds: float, seconds_per_token: float, new_tokens: int):
+        self.prefill_seconds = prefill_seconds
+        self.seconds_per_token = seconds_per_token
+        self.new_tokens = new_tokens
+
+    def generate(self, prompts):
+        time.sleep(self.prefill_seconds + self.seconds_per_token * self.new_tokens)
+        return [prompt + STUB_COMPLETION for prompt in prompts]
+
+    def stream(self, prompt):
+        time.sleep(self.prefill_seconds)
+        words = STUB_COMPLETION.split(" ")
+        for index in range(self.new_tokens):
+            time.sleep(self.seconds_per_token)
+            if index < len(words):
+                yield (" " if index else "") + words[index]
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, started_at: float, latency: float, status: int = None, error: str = None):
+        self.started_at = started_at if self.started_at is None else min(self.started_at, started_at)
+        self.finished_at = time.perf_counter()
+        self.latencies.append(latency)
+        if status is not None:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def to_dict(self):
+        latencies = sorted(self.latencies)
+        total = len(latencies)
+        ok = sum(count for status, count in self.statuses.items() if 200 <= status < 300)
+        elapsed = (self.finished_at - self.started_at) if total else 0.0
+
+        def percentile(q):
+            return round(latencies[min(total - 1, int(total * q))] * 1e3, 1) if total else None
+
+        return {
+            "requests": total,
+            "ok": ok,
+            "rejected_503": self.statuses.get(503, 0),
+            "error_rate": round((total - ok) / total, 4) if total else 0.0,
+            "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p90": percentile(0.90),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1] * 1e3, 1) if total else None
+            },
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "errors": self.errors
+        }
+
+def arrivals(rate: float, duration: float, start: float, rng: random.Random, limit: int = None):
+    """
+    평균 rate req/s 포아송 도착 시각 (start부터 duration초 동안, 최대 limit개)
+    """
+    at, count = start, 0
+    while rate > 0 and (limit is None or count < limit):
+        at += rng.expovariate(rate)
+        if duration is not None and at > start + duration:
+            return
+        yield at
+        count += 1
+
+def build_schedule(args):
+    rng = random.Random(args.seed)
+    schedule = []
+    first, devices = args.first_device_id, args.devices
+
+    for index, at in enumerate(arrivals(args.hourly_rate, args.duration, 0.0, rng)):
+        schedule.append((at, "hourly", first + index % devices, index // devices))
+
+    daily_devices = rng.sample(range(first, first + devices), min(args.daily_devices, devices))
+    for device_id, at in zip(daily_devices, arrivals(args.daily_rate, None, args.burst_at, rng, len(daily_devices))):
+        schedule.append((at, "daily", device_id, None))
+
+    return sorted(schedule)
+
+async def send(client, generator: FleetGenerator, kind: str, device_id: int, hour, args):
+    url = f"{ROUTE_PREFIX}/devices/{device_id}/report"
+    if kind == "hourly":
+        return await client.post(f"{url}/hourly", json=generator.hourly_payload(device_id, hour))
+    if args.daily_mode == "delta":
+        return await client.post(f"{url}/daily/delta", json=generator.daily_payload(device_id, history_days=1))
+    return await client.post(f"{url}/daily", json=generator.daily_payload(device_id, history_days=args.history_days))
+
+async def drive(client, generator: FleetGenerator, args):
+    schedule = build_schedule(args)
+    stats = {"hourly": LoadStats(), "daily": LoadStats()}
+    in_flight = asyncio.Semaphore(args.max_in_flight)
+    loop_started_at = time.perf_counter()
+
+    async def fire(at, kind, device_id, hour):
+        scheduled_at = loop_started_at + at
+        async with in_flight:
+            try:
+                response = await send(client, generator, kind, device_id, hour, args)
+                stats[kind].record(scheduled_at, time.perf_counter() - scheduled_at, status=response.status_code)
+            except Exception as e:
+                stats[kind].record(scheduled_at, time.perf_counter() - scheduled_at, error=type(e).__name__)
+
+    tasks = []
+    for at, kind, device_id, hour in schedule:
+        delay = loop_started_at + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(at, kind, device_id, hour)))
+    await asyncio.gather(*tasks)
+
+    return {kind: value.to_dict() for kind, value in stats.items()}, time.perf_counter() - loop_started_at
+
+async def wait_for_queue(client, timeout: float):
+    """
+    남은 추천 생성 작업이 끝날 때까지 대기 (큐 처리량 확인용)
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        queue = (await client.get(f"{ROUTE_PREFIX}/inference/queue")).json()
+        if queue["depth"] == 0 and queue["running"] == 0:
+            return queue
+        await asyncio.sleep(0.5)
+    return (await client.get(f"{ROUTE_PREFIX}/inference/queue")).json()
+
+async def run_against(client, generator: FleetGenerator, args):
+    results, elapsed = await drive(client, generator, args)
+    drained_started_at = time.perf_counter()
+    queue = await wait_for_queue(client, args.drain_timeout) if args.drain_timeout > 0 else (await client.get(f"{ROUTE_PREFIX}/inference/queue")).json()
+    return {
+        **results,
+        "elapsed_seconds": round(elapsed, 1),
+        "drain_seconds": round(time.perf_counter() - drained_started_at, 1),
+        "queue": queue
+    }
+
+async def run_in_process(generator: FleetGenerator, args):
+    """
+    같은 프로세스에서 app을 실행 (모델 로드 대신 StubEngine 사용)
+    - 클라이언트와 서버가 한 이벤트 루프를 공유하므로 절대 수치보다는 변경 전후 비교용
+    """
+    import httpx
+    import app.main as main
+
+    engine = StubEngine(args.stub_prefill, args.stub_token_seconds, args.stub_new_tokens)
+
+    async def load_stub_engine():
+        main.app.state.engine = engine
+        main.startup_report.mark_model("ready")
+        main.app.state.model_ready.set()
+
+    main.load_engine_in_background = load_stub_engine
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+            return await run_against(client, generator, args)
+
+async def run_remote(generator: FleetGenerator, args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        return await run_against(client, generator, args)
+
+def run(args):
+    generator = FleetGenerator(load_template(args.template), seed=args.seed)
+    results = asyncio.run(run_remote(generator, args) if args.base_url else run_in_process(generator, args))
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.base_url or "in-process (StubEngine)",
+        "config": {key: value for key, value in vars(args).items() if key not in ("output",)},
+        **results
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="가상 fleet 부하 테스트 (hourly / 자정 daily 업로드)")
+    parser.add_argument("--base-url", help="대상 서버 (없으면 같은 프로세스에서 StubEngine으로 실행)")
+    parser.add_argument("--template", default="dummy.json")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--first-device-id", type=int, default=1)
+    parser.add_argument("--history-days", type=int, default=14)
+    parser.add_argument("--hourly-rate", type=float, default=20.0, help="hourly POST 평균 도착률 (req/s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="hourly 부하 시간 (초)")
+    parser.add_argument("--daily-devices", type=int, default=200, help="자정 daily 업로드 기기 수")
+    parser.add_argument("--daily-rate", type=float, default=20.0, help="daily POST 평균 도착률 (req/s)")
+    parser.add_argument("--daily-mode", choices=("full", "delta"), default="full")
+    parser.add_argument("--burst-at", type=float, default=10.0, help="daily 업로드 시작 시각 (초)")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--drain-timeout", type=float, default=0.0, help="부하 종료 후 추천 생성 대기열이 빌 때까지 기다릴 최대 시간 (초)")
+    parser.add_argument("--stub-prefill", type=float, default=0.2, help="StubEngine prefill 시간 (초)")
+    parser.add_argument("--stub-token-seconds", type=float, default=0.02, help="StubEngine 토큰당 디코딩 시간 (초)")
+    parser.add_argument("--stub-new-tokens", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (없으면 stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if not args.base_url:
+            os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir, 'load_test.db')}")
+            os.environ.setdefault("SERVING_MODE", "llm")
+
+            import logging
+            logging.disable(logging.INFO)
+
+        results = run(args)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output + "\n")
\ No newline at end of file
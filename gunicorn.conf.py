@@ -0,0 +1,48 @@
+import os
+import logging
+
+"""
+멀티 워커 서빙 설정
+gunicorn -c gunicorn.conf.py app.main:app
+
+- preload_app : 마스터 프로세스가 app과 추론 엔진을 한 번만 로드한 뒤 워커를 fork
+                -> 모델 가중치는 모든 워커가 읽기 전용 페이지로 공유 (워커 수만큼 모델이 메모리에 올라가지 않음)
+- PRELOAD_MODEL=false : 워커마다 startup에서 모델 로드 (기존 uvicorn --workers와 동일)
+"""
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_MODEL", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+def on_starting(server):
+    """
+    마스터 프로세스, 워커 fork 전 (preload_app일 때 app.main은 이미 import된 상태)
+    """
+    if not preload_app:
+        return
+
+    from app.models.engine import InferenceEngine
+    from app.services.recommendation import SERVING_MODE
+
+    if SERVING_MODE == "template":
+        logger.info("SERVING_MODE is template. Skipping model preload.")
+        return
+
+    if InferenceEngine.preload():
+        logger.info("Inference engine preloaded in master process (pid %s)", os.getpid())
+    else:
+        logger.error("Failed to preload inference engine. Workers will try to load it on startup.")
+
+def post_fork(server, worker):
+    """
+    fork 이전에 만들어진 DB 커넥션을 워커가 함께 쓰지 않도록 풀 초기화
+    """
+    from app.database.connection import engine
+
+    engine.dispose(close=False)
\ No newline at end of file